@@ -0,0 +1,65 @@
+"""
+Benchmark building MySQL table resources as the table count grows.
+
+Compares the old per-table DESCRIBE + SELECT loop with the bulk
+information_schema + UNION ALL path, against the fake driver:
+
+    uv run python benchmarks/bench_catalog.py --tables 10 100 1000 5000
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from fake_mysql import FakeDatabase, default_tables
+from simple_mcp_server import server
+from simple_mcp_server.db import ConnectionPool, Database
+
+
+def legacy_table_descriptions(conn) -> list[str]:
+    """The N+1 loop listResources used before the bulk catalog queries."""
+    descriptions = []
+    cursor = conn.cursor()
+    cursor.execute("SHOW TABLES;")
+    for (table,) in cursor.fetchall():
+        cursor.execute(f"DESCRIBE {table};")
+        schema = ', '.join([f"{col[0]} {col[1]}" for col in cursor.fetchall()])
+        cursor.execute(f"SELECT * FROM {table} LIMIT 3;")
+        rows = cursor.fetchall()
+        descriptions.append(f"Table {table} schema: {schema}\nSample data:\n{rows}")
+    cursor.close()
+    return descriptions
+
+
+async def timed(func) -> float:
+    start = time.perf_counter()
+    await func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--query-latency", type=float, default=0.0002)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'tables':>7} {'legacy':>10} {'queries':>8} {'bulk':>10} {'queries':>8} {'speedup':>8}")
+    for count in args.tables:
+        tables = default_tables(count)
+        legacy_db = FakeDatabase(tables, query_latency=args.query_latency)
+        legacy = asyncio.run(timed(lambda: Database(
+            ConnectionPool(server.MYSQL_CONFIG, connect=legacy_db.connect)
+        ).run(legacy_table_descriptions)))
+
+        bulk_db = FakeDatabase(tables, query_latency=args.query_latency)
+        server.database.pool = ConnectionPool(server.MYSQL_CONFIG, connect=bulk_db.connect)
+        bulk = asyncio.run(timed(server.load_table_resources))
+        print(
+            f"{count:>7} {legacy * 1000:>8.1f}ms {legacy_db.queries:>8} "
+            f"{bulk * 1000:>8.1f}ms {bulk_db.queries:>8} {legacy / bulk:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
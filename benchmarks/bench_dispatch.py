@@ -0,0 +1,93 @@
+"""
+Benchmark per-request overhead of the POST /mcp dispatcher and encoder.
+
+Compares the old if/elif dispatcher, which returned ``.dict()`` results for
+FastAPI to re-encode, with the registry dispatcher that serializes once
+with pydantic-core, on ``listTools`` and a 1,000-entry ``listResources``:
+
+    uv run python benchmarks/bench_dispatch.py --requests 500 --resources 1000
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from fake_mysql import FakeDatabase, default_tables
+from simple_mcp_server import server
+from simple_mcp_server.db import ConnectionPool
+from simple_mcp_server.notes import MemoryNoteStore
+
+legacy_app = FastAPI()
+
+
+@legacy_app.post("/mcp")
+async def legacy_endpoint(request: Request):
+    """The listResources/listTools branches of the old if/elif dispatcher."""
+    data = await request.json()
+    method = data.get("method")
+    if method == "listResources":
+        cursor = (data.get("params") or {}).get("cursor")
+        result, next_cursor = await server.list_resource_page(cursor)
+        return {
+            "jsonrpc": "2.0",
+            "id": data.get("id"),
+            "result": {
+                "resources": [r.dict() for r in result],
+                "nextCursor": next_cursor,
+            }
+        }
+    elif method == "listTools":
+        result = await server.handle_list_tools()
+        return {
+            "jsonrpc": "2.0",
+            "id": data.get("id"),
+            "result": [t.dict() for t in result]
+        }
+
+
+async def measure(app, method: str, requests: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up caches so only dispatch and encoding are measured
+        for _ in range(10):
+            (await client.post("/mcp", json=payload)).raise_for_status()
+        samples = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.post("/mcp", json=payload)
+            response.raise_for_status()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--resources", type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    db = FakeDatabase(default_tables(0))
+    server.database.pool = ConnectionPool(server.MYSQL_CONFIG, connect=db.connect)
+    server.notes = MemoryNoteStore({f"note-{i:05d}": f"Note number {i}" for i in range(args.resources)})
+    server.RESOURCE_PAGE_SIZE = args.resources
+
+    print(f"{'method':>14} {'legacy p50':>11} {'p95':>9} {'registry p50':>13} {'p95':>9} {'speedup':>8}")
+    for method in ("listTools", "listResources"):
+        legacy = asyncio.run(measure(legacy_app, method, args.requests))
+        current = asyncio.run(measure(server.app, method, args.requests))
+        legacy_p50, current_p50 = statistics.median(legacy), statistics.median(current)
+        print(
+            f"{method:>14} {legacy_p50 * 1e6:>9.0f}us {statistics.quantiles(legacy, n=20)[-1] * 1e6:>7.0f}us "
+            f"{current_p50 * 1e6:>11.0f}us {statistics.quantiles(current, n=20)[-1] * 1e6:>7.0f}us "
+            f"{legacy_p50 / current_p50:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
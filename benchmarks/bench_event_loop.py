@@ -0,0 +1,114 @@
+"""
+Load test: listTools latency while listResources saturates a slow database.
+
+Sends requests through the FastAPI app in-process (no sockets) and compares
+running the MySQL work inline on the event loop with the threaded
+``Database`` layer. listTools probes are fired on a fixed schedule and
+timed from when they were due, so time the loop spends blocked counts:
+
+    uv run python benchmarks/bench_event_loop.py --query-latency 0.02
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+import httpx
+
+from fake_mysql import FakeDatabase
+from simple_mcp_server import server
+from simple_mcp_server.cache import TTLCache
+from simple_mcp_server.db import ConnectionPool, Database
+from simple_mcp_server.notes import MemoryNoteStore
+
+
+class InlineDatabase(Database):
+    """The pre-threading behaviour: blocking calls run on the event loop."""
+
+    async def run(self, func, *args, **options):
+        with self.pool.connection() as conn:
+            return func(conn, *args)
+
+
+class UncachedResources(TTLCache):
+    """Every listResources loads from the database; concurrent loads are not shared."""
+
+    async def get_or_load(self, key, loader):
+        return await loader()
+
+
+async def measure(client: httpx.AsyncClient, saturators: int, samples: int, interval: float) -> list[float]:
+    stop = asyncio.Event()
+
+    async def saturate():
+        while not stop.is_set():
+            await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "listResources"})
+            # The in-process transport never suspends on I/O; yield like a socket would.
+            await asyncio.sleep(0)
+
+    async def probe(i: int, due: float) -> float:
+        await client.post("/mcp", json={"jsonrpc": "2.0", "id": i, "method": "listTools"})
+        return time.perf_counter() - due
+
+    tasks = [asyncio.create_task(saturate()) for _ in range(saturators)]
+    await asyncio.sleep(0.05)
+    probes = []
+    start = time.perf_counter()
+    for i in range(samples):
+        due = start + i * interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        probes.append(asyncio.create_task(probe(i, due)))
+    latencies = await asyncio.gather(*probes)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def run(db_class, args) -> tuple[list[float], int]:
+    """listTools latencies, and how many queries the saturating requests ran."""
+    fake = FakeDatabase(query_latency=args.query_latency)
+    pool = ConnectionPool(server.MYSQL_CONFIG, max_size=max(1, args.saturators), connect=fake.connect)
+    server.database = db_class(pool)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = await measure(client, args.saturators, args.samples, args.interval)
+    return latencies, fake.queries
+
+
+def report(label: str, result: tuple[list[float], int]) -> float:
+    latencies, queries = result
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(
+        f"{label:>9}: listTools p50={statistics.median(ms):7.2f}ms  p99={p99:7.2f}ms  "
+        f"max={ms[-1]:7.2f}ms  queries={queries}"
+    )
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--saturators", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between listTools probes")
+    parser.add_argument("--query-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    # Measure the uncached path on every request
+    server.resource_cache = UncachedResources(ttl=0)
+    server.notes = MemoryNoteStore()
+    server.schema_watcher.interval = 0
+
+    report("idle", asyncio.run(run(Database, argparse.Namespace(**{**vars(args), "saturators": 0}))))
+    inline = report("inline", asyncio.run(run(InlineDatabase, args)))
+    threaded = report("threaded", asyncio.run(run(Database, args)))
+    print(f"inline p99 is {inline / threaded:.1f}x the threaded p99")
+    # A blocked loop delays probes by whole queries; off the loop they barely wait
+    if threaded > inline / 2:
+        sys.exit("threaded listTools latency did not stay well below inline")
+
+
+if __name__ == "__main__":
+    main()
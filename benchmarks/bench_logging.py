@@ -0,0 +1,63 @@
+"""
+Benchmark POST /mcp throughput under different logging setups.
+
+"before" is the old setup: everything at DEBUG, full payloads, written
+synchronously. The others use the LOG_LEVEL / LOG_MAX_PAYLOAD / LOG_QUEUE
+settings. Log output goes to a temporary file:
+
+    uv run python benchmarks/bench_logging.py --requests 2000 --payload 20000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from fake_mysql import FakeDatabase, default_tables
+from simple_mcp_server import logs, server
+from simple_mcp_server.db import ConnectionPool
+from simple_mcp_server.notes import MemoryNoteStore
+
+
+async def run(requests: int, payload: int) -> float:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.post("/mcp", json={
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "callTool",
+                "params": {"name": "add-note", "arguments": {"name": f"note-{i % 100}", "content": "x" * payload}},
+            })
+            response.raise_for_status()
+        return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--payload", type=int, default=20000, help="note content size in characters")
+    args = parser.parse_args()
+    db = FakeDatabase(default_tables(2))
+    server.database.pool = ConnectionPool(server.MYSQL_CONFIG, connect=db.connect)
+    server.notes = MemoryNoteStore()
+
+    results = {}
+    with tempfile.TemporaryFile("w") as sink:
+        for label, level, max_payload, use_queue in [
+            ("before", "DEBUG", 0, False),
+            ("debug+truncate", "DEBUG", 500, False),
+            ("debug+queue", "DEBUG", 500, True),
+            ("info", "INFO", 500, False),
+        ]:
+            logs.MAX_PAYLOAD = max_payload
+            logs.configure_logging(level, use_queue, stream=sink)
+            results[label] = asyncio.run(run(args.requests, args.payload))
+            print(f"{label:>15}: {results[label]:8.1f} req/s  ({results[label] / results['before']:.2f}x)")
+        logs.configure_logging("WARNING", False, stream=sink)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark a burst of add-note writes against the SQLite note store.
+
+Compares one transaction per note with write-behind batching, which
+commits the whole burst in a few transactions:
+
+    uv run python benchmarks/bench_notes.py --notes 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from simple_mcp_server.notes import SQLiteNoteStore, WriteBehindNoteStore
+
+
+async def burst(store, notes: int, concurrency: int) -> float:
+    async def writer(worker: int):
+        for i in range(worker, notes, concurrency):
+            await store.put(f"note-{i:06d}", f"Content of note {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(w) for w in range(concurrency)))
+    await store.flush()
+    elapsed = time.perf_counter() - start
+    assert await store.count() == notes
+    await store.close()
+    return notes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--notes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.01, help="write-behind delay in seconds")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct = asyncio.run(burst(
+            SQLiteNoteStore(os.path.join(tmp, "direct.db")), args.notes, args.concurrency
+        ))
+        batched_store = WriteBehindNoteStore(SQLiteNoteStore(os.path.join(tmp, "batched.db")), args.delay)
+        batched = asyncio.run(burst(batched_store, args.notes, args.concurrency))
+    print(f"  per-note commits: {direct:9.1f} notes/s  ({args.notes} transactions)")
+    print(f"      write-behind: {batched:9.1f} notes/s  ({batched_store.batches} transactions)")
+    print(f"           speedup: {batched / direct:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark listResources throughput with and without the MySQL connection pool.
+
+Runs offline against the fake driver in ``fake_mysql.py``:
+
+    uv run python benchmarks/bench_pool.py --requests 500 --connect-latency 0.005
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from fake_mysql import FakeDatabase, default_tables
+from simple_mcp_server import server
+from simple_mcp_server.db import ConnectionPool
+from simple_mcp_server.notes import MemoryNoteStore
+
+
+async def run(requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await server.list_resource_page()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--tables", type=int, default=2)
+    parser.add_argument("--connect-latency", type=float, default=0.002)
+    parser.add_argument("--query-latency", type=float, default=0.0002)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    # Measure the uncached path on every request
+    server.resource_cache.ttl = 0
+    server.notes = MemoryNoteStore()
+    server.schema_watcher.interval = 0
+
+    results = {}
+    for label, pool_kwargs in [
+        # idle_timeout=0 with min_size=0 closes every connection on the next
+        # checkout, i.e. one handshake per request like the old code path.
+        ("no pool", {"min_size": 0, "idle_timeout": 0}),
+        ("pool", {"min_size": 1}),
+    ]:
+        db = FakeDatabase(default_tables(args.tables), args.connect_latency, args.query_latency)
+        server.database.pool = ConnectionPool(server.MYSQL_CONFIG, connect=db.connect, **pool_kwargs)
+        rps = asyncio.run(run(args.requests))
+        results[label] = rps
+        print(f"{label:>8}: {rps:8.1f} req/s  ({db.connects} connects, {db.queries} queries)")
+    print(f" speedup: {results['pool'] / results['no pool']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
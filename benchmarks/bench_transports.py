@@ -0,0 +1,287 @@
+"""
+Load-test every transport and record per-method latency and throughput.
+
+Drives the package server's HTTP ``POST /mcp`` endpoint, the root
+``server.py`` over SSE (``MCP_SERVER_MODE=http``) and over stdio, each in
+its own process. MySQL is the in-memory stand-in from ``fake_mysql.py`` and
+notes are a SQLite file seeded with ``--notes`` entries, so nothing outside
+the repository is needed. Results are printed and written as JSON; pass an
+earlier file as ``--baseline`` to compare two commits:
+
+    uv run python benchmarks/bench_transports.py --concurrency 1 16 --requests 500 --output after.json --baseline before.json
+
+Concurrency is the number of HTTP clients or SSE sessions sending requests
+back to back; stdio has one session, with that many requests in flight.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from pydantic import AnyUrl
+
+from simple_mcp_server.notes import SQLiteNoteStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+TRANSPORTS = ("http", "sse", "stdio")
+
+# (label, JSON-RPC method, params) for the package server's POST /mcp
+HTTP_CALLS = [
+    ("listTools", "listTools", {}),
+    ("listResources", "listResources", {}),
+    ("readResource file", "readResource", {"uri": "file://local/sample1.txt"}),
+    ("readResource table", "readResource", {"uri": "mysql://localhost/bank/customers"}),
+    ("callTool search-notes", "callTool", {"name": "search-notes", "arguments": {"query": "benchmark"}}),
+    ("callTool add-note", "callTool", {"name": "add-note", "arguments": {"name": "bench", "content": "x"}}),
+]
+
+# (label, call on an initialized ClientSession) for the root server
+MCP_CALLS = [
+    ("tools/list", lambda session: session.list_tools()),
+    ("resources/list", lambda session: session.list_resources()),
+    ("resources/read note", lambda session: session.read_resource(AnyUrl("note://internal/note-00000"))),
+    ("prompts/get", lambda session: session.get_prompt("summarize-notes", {"limit": "50"})),
+    ("tools/call add-note", lambda session: session.call_tool("add-note", {"name": "bench", "content": "x"})),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(state_dir: str, **extra) -> dict:
+    return {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.path.join(ROOT, "src"), HERE, os.environ.get("PYTHONPATH")])),
+        "NOTES_STORE": f"sqlite:///{os.path.join(state_dir, 'notes.db')}",
+        "FILE_INDEX_PATH": "",
+        "LOG_LEVEL": "WARNING",
+        **extra,
+    }
+
+
+def seed_notes(state_dir: str, count: int):
+    async def seed():
+        store = SQLiteNoteStore(os.path.join(state_dir, "notes.db"))
+        await store.put_many({f"note-{i:05d}": f"Content of benchmark note {i}" for i in range(count)})
+        await store.close()
+    asyncio.run(seed())
+
+
+def wait_until_up(url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def serve_http(port: int, tables: int):
+    """Run the package server with the fake MySQL backend (``--serve-http``)."""
+    import uvicorn
+
+    from fake_mysql import FakeDatabase, default_tables
+    from simple_mcp_server import server
+    from simple_mcp_server.db import ConnectionPool
+
+    db = FakeDatabase(default_tables(tables, rows=100))
+    server.database.pool = ConnectionPool(server.MYSQL_CONFIG, connect=db.connect)
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors, "throughput": 0.0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1e3,
+        "p95_ms": cuts[94] * 1e3,
+        "p99_ms": cuts[98] * 1e3,
+    }
+
+
+async def run_workers(call, requests: int, concurrency: int) -> dict:
+    """Send ``requests`` calls from ``concurrency`` workers; ``call(worker)`` sends one."""
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker(index: int):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                await call(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def bench_http(args, state_dir: str, concurrency: int) -> list[dict]:
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--serve-http", str(port), "--tables", str(args.tables)],
+        env=server_env(state_dir), cwd=state_dir,
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}/mcp/cache", process)
+        results = []
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            for label, method, params in HTTP_CALLS:
+                async def call(worker, method=method, params=params):
+                    response = await client.post("/mcp", json={"jsonrpc": "2.0", "id": worker, "method": method, "params": params})
+                    response.raise_for_status()
+                    if "error" in response.json():
+                        raise RuntimeError(response.json()["error"])
+                await run_workers(call, min(args.requests, 20), concurrency)
+                results.append({"method": label, **await run_workers(call, args.requests, concurrency)})
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def measure_sessions(sessions: list[ClientSession], requests: int, concurrency: int) -> list[dict]:
+    results = []
+    for label, send in MCP_CALLS:
+        async def call(worker, send=send):
+            result = await send(sessions[worker % len(sessions)])
+            if getattr(result, "isError", False):
+                raise RuntimeError(result.content)
+        await run_workers(call, min(requests, 20), concurrency)
+        results.append({"method": label, **await run_workers(call, requests, concurrency)})
+    return results
+
+
+async def bench_sse(args, state_dir: str, concurrency: int) -> list[dict]:
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py")],
+        env=server_env(state_dir, MCP_SERVER_MODE="http", MCP_HTTP_PORT=str(port)), cwd=state_dir,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}/mcp/queues", process)
+        async with contextlib.AsyncExitStack() as stack:
+            sessions = []
+            for _ in range(concurrency):
+                read, write = await stack.enter_async_context(sse_client(f"http://127.0.0.1:{port}/mcp/stream"))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                sessions.append(session)
+            return await measure_sessions(sessions, args.requests, concurrency)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def bench_stdio(args, state_dir: str, concurrency: int) -> list[dict]:
+    params = StdioServerParameters(
+        command=sys.executable, args=[os.path.join(ROOT, "server.py")], env=server_env(state_dir), cwd=state_dir,
+    )
+    async with stdio_client(params) as (read, write), ClientSession(read, write) as session:
+        await session.initialize()
+        return await measure_sessions([session], args.requests, concurrency)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list[dict], baseline: dict | None):
+    header = f"{'transport':>9} {'conc':>4} {'method':<22} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>4}"
+    print(header + ("  vs baseline" if baseline else ""))
+    for row in results:
+        line = (
+            f"{row['transport']:>9} {row['concurrency']:>4} {row['method']:<22} {row['throughput']:>9.1f} "
+            + " ".join(f"{'-' if row[k] is None else f'{row[k]:.2f}':>8}" for k in ("p50_ms", "p95_ms", "p99_ms"))
+            + f" {row['errors']:>4}"
+        )
+        old = (baseline or {}).get((row["transport"], row["concurrency"], row["method"]))
+        if old and old["throughput"] and row["p99_ms"] is not None:
+            line += f"  {row['throughput'] / old['throughput']:.2f}x req/s, p99 {old['p99_ms']:.2f} -> {row['p99_ms']:.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=500, help="requests per method and concurrency level")
+    parser.add_argument("--notes", type=int, default=1000, help="notes seeded into SQLite")
+    parser.add_argument("--tables", type=int, default=20, help="tables in the fake MySQL database")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--serve-http", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_http:
+        serve_http(args.serve_http, args.tables)
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(r["transport"], r["concurrency"], r["method"]): r for r in json.load(f)["results"]}
+
+    benches = {"http": bench_http, "sse": bench_sse, "stdio": bench_stdio}
+    results = []
+    for transport in args.transports:
+        for concurrency in args.concurrency:
+            # A fresh server and notes file for every run
+            with tempfile.TemporaryDirectory() as state_dir:
+                seed_notes(state_dir, args.notes)
+                rows = asyncio.run(benches[transport](args, state_dir, concurrency))
+            results += [{"transport": transport, "concurrency": concurrency, **row} for row in rows]
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "cpus": os.cpu_count(),
+                "python": sys.version.split()[0],
+                "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "serve_http")},
+                "results": results,
+            }, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
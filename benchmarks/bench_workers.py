@@ -0,0 +1,119 @@
+"""
+Benchmark HTTP throughput of the package server with 1 to N worker processes.
+
+Starts ``uvicorn --workers <n>`` for each worker count with notes and
+subscriptions in SQLite files shared by the workers, then drives it with
+load-generating processes posting JSON-RPC requests for a fixed time:
+
+    uv run python benchmarks/bench_workers.py --workers 1 2 4 --seconds 10
+
+Throughput only scales while there are idle cores for the workers and the
+load generators; run it on a machine with at least twice as many cores as
+the largest worker count.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, state_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])),
+        "WEB_CONCURRENCY": str(workers),
+        "NOTES_STORE": f"sqlite:///{os.path.join(state_dir, 'notes.db')}",
+        "MCP_STATE_PATH": os.path.join(state_dir, "state.db"),
+        "FILE_INDEX_PATH": "",
+        "LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "simple_mcp_server.server:app",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=env, cwd=state_dir,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/mcp/cache", timeout=1).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+async def drive(port: int, method: str, params: dict, concurrency: int, seconds: float) -> int:
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+    done = 0
+    deadline = time.monotonic() + seconds
+
+    async def client():
+        nonlocal done
+        # One connection per client, like separate MCP clients
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as http:
+            while time.monotonic() < deadline:
+                (await http.post("/mcp", json=payload)).raise_for_status()
+                done += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return done
+
+
+def load_process(args: tuple) -> int:
+    return asyncio.run(drive(*args))
+
+
+def measure(workers: int, args) -> float:
+    with tempfile.TemporaryDirectory() as state_dir:
+        port = free_port()
+        process = start_server(workers, port, state_dir)
+        try:
+            # Warm up every worker
+            with multiprocessing.Pool(args.clients) as pool:
+                pool.map(load_process, [(port, args.method, {}, args.concurrency, 1.0)] * args.clients)
+                counts = pool.map(
+                    load_process, [(port, args.method, {}, args.concurrency, args.seconds)] * args.clients
+                )
+        finally:
+            process.terminate()
+            process.wait()
+    return sum(counts) / args.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections per load process")
+    parser.add_argument("--method", default="listTools")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} load processes x {args.concurrency} connections, {args.method}")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        throughput = measure(workers, args)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+In-memory stand-in for ``mysql.connector`` used by the offline benchmarks.
+
+Every connect and every query sleeps for a configurable latency so that
+handshake and round-trip costs show up in the numbers the way they would
+against a real server. Setting ``stalled`` makes queries hang until they
+are stopped with ``KILL QUERY`` or ``stalled`` is cleared, like a locked or
+overloaded server.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+import weakref
+
+import mysql.connector
+
+
+class FakeDatabase:
+    def __init__(self, tables: dict | None = None, connect_latency=0.002, query_latency=0.0002):
+        # table name -> (list of (column, type), list of row tuples)
+        self.tables = tables if tables is not None else default_tables()
+        self.connect_latency = connect_latency
+        self.query_latency = query_latency
+        # table name -> fake UPDATE_TIME; bump it to simulate a write
+        self.versions: dict = {}
+        self.connects = 0
+        self.queries = 0
+        self.stalled = False
+        self.connections = weakref.WeakValueDictionary()
+        self._ids = itertools.count(1)
+
+    def connect(self, **config):
+        time.sleep(self.connect_latency)
+        self.connects += 1
+        conn = FakeConnection(self, next(self._ids))
+        self.connections[conn.connection_id] = conn
+        return conn
+
+
+def default_tables(count: int = 2, rows: int = 3) -> dict:
+    tables = {}
+    for i in range(count):
+        name = "customers" if i == 0 else "transactions" if i == 1 else f"table_{i}"
+        columns = [("id", "int"), ("name", "varchar(100)"), ("balance", "decimal(10,2)")]
+        tables[name] = (columns, [(r + 1, f"row-{r}", 100.0 * r) for r in range(rows)])
+    return tables
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase, connection_id: int):
+        self.db = db
+        self.connection_id = connection_id
+        self.open = True
+        self.killed = threading.Event()
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        if not self.open:
+            raise RuntimeError("connection closed")
+
+    def is_connected(self):
+        return self.open
+
+    def close(self):
+        self.open = False
+
+
+class FakeCursor:
+    def __init__(self, conn: FakeConnection):
+        self.conn = conn
+        self._rows: list = []
+        self.description = None
+
+    def execute(self, sql: str, params=None):
+        db = self.conn.db
+        time.sleep(db.query_latency)
+        db.queries += 1
+        sql = re.sub(r"/\*\+.*?\*/ ", "", sql.strip().rstrip(";"))
+        m = re.fullmatch(r"KILL QUERY (\d+)", sql)
+        if m:
+            target = db.connections.get(int(m.group(1)))
+            if target is not None:
+                target.killed.set()
+            self._rows = []
+            return
+        while db.stalled and not self.conn.killed.wait(0.01):
+            pass
+        if self.conn.killed.is_set():
+            self.conn.killed.clear()
+            raise mysql.connector.errors.DatabaseError(msg="Query execution was interrupted", errno=1317)
+        if re.fullmatch(r"SHOW TABLES", sql, re.I):
+            self._rows = [(name,) for name in db.tables]
+            self.description = [("Tables",)]
+            return
+        m = re.fullmatch(r"DESCRIBE (\w+)", sql, re.I)
+        if m:
+            columns, _ = db.tables[m.group(1)]
+            self._rows = [(col, typ, "YES", "", None, "") for col, typ in columns]
+            self.description = [("Field",), ("Type",), ("Null",), ("Key",), ("Default",), ("Extra",)]
+            return
+        m = re.fullmatch(r"SELECT \* FROM `?(\w+)`? LIMIT (\d+)", sql, re.I)
+        if m:
+            columns, rows = db.tables[m.group(1)]
+            self._rows = rows[: int(m.group(2))]
+            self.description = [(col,) for col, _ in columns]
+            return
+        if "FROM information_schema.COLUMNS" in sql and sql.startswith(("SELECT TABLE_NAME", "SELECT c.TABLE_NAME")):
+            names = sorted(db.tables)
+            if params and len(params) == 4:
+                _, after, limit, _ = params
+                names = [name for name in names if name > after][:limit]
+            self._rows = [(name, col, typ) for name in names for col, typ in db.tables[name][0]]
+            self.description = [("TABLE_NAME",), ("COLUMN_NAME",), ("COLUMN_TYPE",)]
+            return
+        m = re.fullmatch(
+            r"SELECT \* FROM `?(\w+)`?(?: WHERE `(\w+)` > %s)?(?: ORDER BY `(\w+)`)?"
+            r"(?: LIMIT (\d+)(?: OFFSET (\d+))?)?",
+            sql,
+        )
+        if m:
+            table, where, order_by, limit, offset = m.groups()
+            if table not in db.tables:
+                raise mysql.connector.errors.ProgrammingError(msg=f"Table '{table}' doesn't exist", errno=1146)
+            columns, rows = db.tables[table]
+            names = [col for col, _ in columns]
+            if where:
+                i = names.index(where)
+                rows = [row for row in rows if row[i] > type(row[i])(params[0])]
+            if order_by:
+                rows = sorted(rows, key=lambda row: row[names.index(order_by)])
+            start = int(offset or 0)
+            self._rows = rows[start:start + int(limit)] if limit else rows[start:]
+            self.description = [(col,) for col in names]
+            return
+        if sql.startswith("SET SESSION"):
+            self._rows = []
+            return
+        if sql.startswith("SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME FROM information_schema.TABLES"):
+            self._rows = [(name, None, db.versions.get(name)) for name in db.tables]
+            return
+        if sql.startswith("SELECT COUNT(*), MAX(CREATE_TIME), MAX(UPDATE_TIME)"):
+            self._rows = [(len(db.tables), None, None, hash(repr(sorted(db.tables.items()))))]
+            return
+        if sql.startswith("(SELECT %s, JSON_ARRAY("):
+            # One "(SELECT %s, JSON_ARRAY(...) FROM `t` LIMIT n)" branch per table
+            limits = re.findall(r"LIMIT (\d+)\)", sql)
+            self._rows = [
+                (name, json.dumps(list(row)))
+                for name, limit in zip(params, limits)
+                for row in db.tables[name][1][: int(limit)]
+            ]
+            self.description = [("table",), ("row",)]
+            return
+        raise NotImplementedError(f"Fake MySQL cannot execute: {sql}")
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._rows = []
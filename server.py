@@ -1,6 +1,12 @@
 import asyncio
+import contextlib
+import contextvars
+import json
 import logging
 import os
+import sys
+import time
+import uuid
 from typing import AsyncGenerator
 
 import anyio
@@ -8,15 +14,26 @@ from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStre
 from anyio import create_memory_object_stream
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from sse_starlette.sse import EventSourceResponse
 import uvicorn
 
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
+from mcp.shared.message import SessionMessage
 from pydantic import AnyUrl
 import mcp.server.stdio
 
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from simple_mcp_server.cache import LRUCache
+from simple_mcp_server.files import DirectoryIndex, load_file_resource
+from simple_mcp_server.logs import Truncated, configure_logging
+from simple_mcp_server.metrics import CONTENT_TYPE, REGISTRY
+from simple_mcp_server.notes import open_note_store
+from simple_mcp_server.profiling import Profile, Profiler, span
+from simple_mcp_server.prompts import note_line, render_note_summary
+
 class AsyncIterableStream:
     def __init__(self, stream: MemoryObjectReceiveStream):
         self._stream = stream
@@ -30,7 +47,7 @@ class AsyncIterableStream:
         except anyio.EndOfStream:
             raise StopAsyncIteration
         except Exception as e:
-            logging.error(f"Error in stream: {e}")
+            logging.error("Error in stream: %s", e)
             raise
 
     async def __aenter__(self):
@@ -39,42 +56,330 @@ class AsyncIterableStream:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         return None
 
-# Store notes as a simple key-value dict to demonstrate state management
-notes: dict[str, str] = {}
+def queue_stats(stream: MemoryObjectSendStream | MemoryObjectReceiveStream) -> dict:
+    """Depth and waiter counts for one memory object stream."""
+    stats = stream.statistics()
+    return {
+        "depth": stats.current_buffer_used,
+        "capacity": stats.max_buffer_size,
+        "waiting_senders": stats.tasks_waiting_send,
+        "waiting_receivers": stats.tasks_waiting_receive,
+    }
+
+class Subscriber:
+    """Where one client's notifications are written, and the URIs it subscribed to."""
+
+    def __init__(self, stream: MemoryObjectSendStream, timeout: float = 1.0):
+        self.stream = stream
+        self.timeout = timeout
+        self.subscriptions: set[str] = set()
+        self.dropped = 0
+
+    async def send(self, notification: types.ServerNotification):
+        """Write ``notification``, dropping it if the client is gone or not reading."""
+        message = SessionMessage(types.JSONRPCMessage(types.JSONRPCNotification(
+            jsonrpc="2.0",
+            **notification.model_dump(by_alias=True, mode="json", exclude_none=True),
+        )))
+        try:
+            with anyio.fail_after(self.timeout):
+                await self.stream.send(message)
+        except (TimeoutError, anyio.BrokenResourceError, anyio.ClosedResourceError):
+            self.dropped += 1
+
+# The subscriber of the client whose request is being handled
+current_subscriber: contextvars.ContextVar[Subscriber] = contextvars.ContextVar("current_subscriber")
+
+class ChangeNotifier:
+    """
+    Coalesces resource changes and notifies clients in the background.
+
+    ``list_changed()`` and ``updated(uri)`` only record the change. ``window``
+    seconds after the first change of a burst, every subscriber gets one
+    ``resources/list_changed`` and a ``resources/updated`` for each changed
+    URI it subscribed to, so tool calls never wait on delivery.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self.subscribers: set[Subscriber] = set()
+        self.changes = 0
+        self.sent = 0
+        self._list_changed = False
+        self._updated: set[str] = set()
+        self._task: asyncio.Task | None = None
+
+    def list_changed(self):
+        self._list_changed = True
+        self._schedule()
+
+    def updated(self, uri: str):
+        self._updated.add(uri)
+        self._schedule()
+
+    def _schedule(self):
+        self.changes += 1
+        if self._task is None or self._task.done():
+            # A fresh context, so delivery does not inherit the tool call that started it
+            self._task = asyncio.get_running_loop().create_task(self._deliver(), context=contextvars.Context())
+
+    async def _deliver(self):
+        # Keep going while changes arrive during delivery
+        while self._list_changed or self._updated:
+            await asyncio.sleep(self.window)
+            list_changed, self._list_changed = self._list_changed, False
+            updated, self._updated = self._updated, set()
+            sends = []
+            for subscriber in list(self.subscribers):
+                if list_changed:
+                    sends.append(subscriber.send(types.ServerNotification(
+                        types.ResourceListChangedNotification(method="notifications/resources/list_changed")
+                    )))
+                for uri in updated & subscriber.subscriptions:
+                    sends.append(subscriber.send(types.ServerNotification(
+                        types.ResourceUpdatedNotification(
+                            method="notifications/resources/updated",
+                            params=types.ResourceUpdatedNotificationParams(uri=AnyUrl(uri)),
+                        )
+                    )))
+            await asyncio.gather(*sends)
+            self.sent += len(sends)
+
+    def stats(self) -> dict:
+        return {
+            "window": self.window,
+            "subscribers": len(self.subscribers),
+            "changes": self.changes,
+            "sent": self.sent,
+            "pending": self._list_changed or bool(self._updated),
+        }
+
+class Session:
+    """One SSE client: its own request/response streams and MCP session task."""
+
+    def __init__(self, session_id: str, request_queue_size: int, response_queue_size: int):
+        self.id = session_id
+        self.request_send, self.request_receive = create_memory_object_stream(request_queue_size)
+        self.response_send, self.response_receive = create_memory_object_stream(response_queue_size)
+        self.rejected = {"request_queue_full": 0, "response_queue_full": 0}
+        self.subscriber = Subscriber(self.response_send)
+        self.consumers = 0
+        self.last_active = time.monotonic()
+        self.task: asyncio.Task | None = None
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "requests": queue_stats(self.request_send),
+            "responses": queue_stats(self.response_send),
+            "rejected": self.rejected,
+            "subscriptions": len(self.subscriber.subscriptions),
+            "dropped_notifications": self.subscriber.dropped,
+            "consumers": self.consumers,
+            "idle_seconds": time.monotonic() - self.last_active,
+        }
+
+    async def close(self):
+        self.request_send.close()
+        self.response_receive.close()
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self.task
+
+class SessionRegistry:
+    """
+    Sessions keyed by ID, each running its own ``server.run`` task.
+
+    Sessions with no SSE consumer and no traffic for ``idle_timeout``
+    seconds are closed by ``reap_idle``.
+    """
+
+    def __init__(
+        self,
+        run_session,
+        request_queue_size: int,
+        response_queue_size: int,
+        idle_timeout: float,
+        max_sessions: int,
+    ):
+        self.run_session = run_session
+        self.request_queue_size = request_queue_size
+        self.response_queue_size = response_queue_size
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: dict[str, Session] = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        if len(self._sessions) >= self.max_sessions:
+            raise RuntimeError(f"Too many sessions (max {self.max_sessions})")
+        session = Session(uuid.uuid4().hex, self.request_queue_size, self.response_queue_size)
+        self._sessions[session.id] = session
+        session.task = asyncio.create_task(self._run(session))
+        return session
+
+    async def _run(self, session: Session):
+        try:
+            await self.run_session(session)
+        except Exception as e:
+            logging.error("Session %s failed: %s", session.id, e)
+        finally:
+            self._sessions.pop(session.id, None)
+
+    def get(self, session_id: str) -> Session | None:
+        return self._sessions.get(session_id)
+
+    async def close(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            await session.close()
+
+    async def reap_idle(self):
+        """Periodically close sessions that have been idle for ``idle_timeout``."""
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 1))
+            now = time.monotonic()
+            idle = [
+                session_id for session_id, session in self._sessions.items()
+                if session.consumers == 0 and now - session.last_active > self.idle_timeout
+            ]
+            for session_id in idle:
+                logging.debug("Closing idle session %s", session_id)
+                await self.close(session_id)
+
+    def stats(self) -> dict:
+        sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "connected": sum(1 for s in sessions if s.consumers),
+            "request_depth": sum(s.request_send.statistics().current_buffer_used for s in sessions),
+            "response_depth": sum(s.response_send.statistics().current_buffer_used for s in sessions),
+            "rejected": {
+                key: sum(s.rejected[key] for s in sessions)
+                for key in ("request_queue_full", "response_queue_full")
+            },
+        }
+
+# Notes persist in SQLite by default, shared with the package server and
+# between workers (NOTES_STORE=memory | sqlite:///<path>)
+notes = open_note_store(
+    os.environ.get("NOTES_STORE", "sqlite:///notes.db"),
+    write_behind=float(os.environ.get("NOTES_WRITE_BEHIND", "0")),
+    max_batch=int(os.environ.get("NOTES_WRITE_BATCH", "1000")),
+)
 
 server = Server("simple-mcp-server")
 
+RESOURCE_FILES_DIR = os.environ.get(
+    "RESOURCE_FILES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "files")
+)
+# Recursive index of RESOURCE_FILES_DIR, updated from directory mtimes on
+# each listing and saved to FILE_INDEX_PATH across restarts
+file_index = DirectoryIndex(RESOURCE_FILES_DIR, os.environ.get("FILE_INDEX_PATH", "file_index.json") or None)
+# Largest file (or file range) returned by resources/read
+FILE_READ_MAX_BYTES = int(os.environ.get("FILE_READ_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# summarize-notes includes at most PROMPT_MAX_BYTES of notes, split into
+# messages of PROMPT_CHUNK_BYTES; rendered prompts are kept per notes
+# version and arguments in a PROMPT_CACHE_BYTES LRU
+PROMPT_MAX_BYTES = int(os.environ.get("PROMPT_MAX_BYTES", "200000"))
+PROMPT_CHUNK_BYTES = int(os.environ.get("PROMPT_CHUNK_BYTES", "32768"))
+prompt_cache = LRUCache(int(os.environ.get("PROMPT_CACHE_BYTES", str(8 * 1024 * 1024))))
+
+# Resource change notifications, coalesced over RESOURCE_NOTIFY_WINDOW seconds
+notifier = ChangeNotifier(float(os.environ.get("RESOURCE_NOTIFY_WINDOW", "0.1")))
+
+def initialization_options() -> InitializationOptions:
+    capabilities = server.get_capabilities(
+        notification_options=NotificationOptions(resources_changed=True),
+        experimental_capabilities={},
+    )
+    # The low-level server always reports subscribe=False
+    capabilities.resources.subscribe = True
+    return InitializationOptions(
+        server_name="simple-mcp-server",
+        server_version="0.1.0",
+        capabilities=capabilities,
+    )
+
+async def serve(read_stream, write_stream, subscriber: Subscriber):
+    """Run one MCP session whose notifications go to ``subscriber``."""
+    current_subscriber.set(subscriber)
+    notifier.subscribers.add(subscriber)
+    try:
+        await server.run(read_stream, write_stream, initialization_options())
+    finally:
+        notifier.subscribers.discard(subscriber)
+
 @server.list_resources()
 async def handle_list_resources() -> list[types.Resource]:
     """
-    List available note resources.
-    Each note is exposed as a resource with a custom note:// URI scheme.
+    List available note and file resources.
+    Each note is exposed as a resource with a custom note:// URI scheme,
+    each file under RESOURCE_FILES_DIR as file://local/<path>.
     """
-    return [
-        types.Resource(
-            uri=AnyUrl(f"note://internal/{name}"),
-            name=f"Note: {name}",
-            description=f"A simple note named {name}",
-            mimeType="text/plain",
-        )
-        for name in notes
-    ]
+    with span("files.index"):
+        await anyio.to_thread.run_sync(file_index.refresh)
+    with span("notes.names"):
+        names = await notes.names()
+    with span("resources.build"):
+        return [
+            types.Resource(
+                uri=AnyUrl(f"note://internal/{name}"),
+                name=f"Note: {name}",
+                description=f"A simple note named {name}",
+                mimeType="text/plain",
+            )
+            for name in names
+        ] + [
+            types.Resource(
+                uri=AnyUrl(f"file://local/{fname}"),
+                name=f"File: {fname}",
+                description=f"A file named {fname}",
+            )
+            for fname in file_index.names
+        ]
 
 @server.read_resource()
-async def handle_read_resource(uri: AnyUrl) -> str:
+async def handle_read_resource(uri: AnyUrl) -> str | list[ReadResourceContents]:
     """
     Read a specific note's content by its URI.
     The note name is extracted from the URI host component.
+    File URIs accept ?bytes=<start>-<end> or ?lines=<start>-<end>.
     """
+    if uri.scheme == "file":
+        content, mime_type = await anyio.to_thread.run_sync(
+            load_file_resource, str(uri), RESOURCE_FILES_DIR, FILE_READ_MAX_BYTES
+        )
+        return [ReadResourceContents(content=content, mime_type=mime_type)]
     if uri.scheme != "note":
         raise ValueError(f"Unsupported URI scheme: {uri.scheme}")
 
     name = uri.path
     if name is not None:
         name = name.lstrip("/")
-        return notes[name]
+        content = await notes.get(name)
+        if content is not None:
+            return content
     raise ValueError(f"Note not found: {name}")
 
+@server.subscribe_resource()
+async def handle_subscribe_resource(uri: AnyUrl) -> None:
+    """Send resources/updated for ``uri`` to this client when it changes."""
+    # Only note changes are published; a file subscription would never fire
+    if uri.scheme != "note":
+        raise ValueError(f"Subscriptions are only supported for note:// resources, not {uri.scheme}://")
+    current_subscriber.get().subscriptions.add(str(uri))
+
+@server.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri: AnyUrl) -> None:
+    current_subscriber.get().subscriptions.discard(str(uri))
+
 @server.list_prompts()
 async def handle_list_prompts() -> list[types.Prompt]:
     """
@@ -90,41 +395,85 @@ async def handle_list_prompts() -> list[types.Prompt]:
                     name="style",
                     description="Style of the summary (brief/detailed)",
                     required=False,
-                )
+                ),
+                types.PromptArgument(
+                    name="limit",
+                    description="Summarize at most this many notes",
+                    required=False,
+                ),
+                types.PromptArgument(
+                    name="filter",
+                    description="Only notes matching this full-text search (term* matches prefixes)",
+                    required=False,
+                ),
             ],
         )
     ]
 
+# Notes read concurrently while filling the summarize-notes budget
+PROMPT_FETCH_BATCH = 32
+
+async def load_prompt_notes(names: list[str]) -> list[tuple[str, str]]:
+    """
+    ``(name, content)`` of the first ``names``, read until their prompt
+    lines fill PROMPT_MAX_BYTES; the rest would be left out anyway.
+    """
+    items, size = [], 0
+    for start in range(0, len(names), PROMPT_FETCH_BATCH):
+        batch = names[start:start + PROMPT_FETCH_BATCH]
+        contents = await asyncio.gather(*(notes.get(name) for name in batch))
+        for name, content in zip(batch, contents):
+            if content is None:
+                # Deleted since it was listed
+                continue
+            items.append((name, content))
+            size += len(note_line(name, content, PROMPT_CHUNK_BYTES).encode("utf-8")) + 1
+            if size > PROMPT_MAX_BYTES:
+                return items
+    return items
+
 @server.get_prompt()
 async def handle_get_prompt(
     name: str, arguments: dict[str, str] | None
 ) -> types.GetPromptResult:
     """
     Generate a prompt by combining arguments with server state.
-    The prompt includes all current notes and can be customized via arguments.
+    The prompt includes the current notes, up to PROMPT_MAX_BYTES of them,
+    and can be customized via arguments.
     """
     if name != "summarize-notes":
         raise ValueError(f"Unknown prompt: {name}")
 
-    style = (arguments or {}).get("style", "brief")
-    detail_prompt = " Give extensive details." if style == "detailed" else ""
-
-    return types.GetPromptResult(
-        description="Summarize the current notes",
-        messages=[
-            types.PromptMessage(
-                role="user",
-                content=types.TextContent(
-                    type="text",
-                    text=f"Here are the current notes to summarize:{detail_prompt}\n\n"
-                    + "\n".join(
-                        f"- {name}: {content}"
-                        for name, content in notes.items()
-                    ),
-                ),
-            )
-        ],
-    )
+    arguments = arguments or {}
+    style = arguments.get("style", "brief")
+    limit = arguments.get("limit")
+    if limit is not None:
+        if not str(limit).isdigit() or int(limit) < 1:
+            raise ValueError(f"'limit' must be a positive integer, got '{limit}'")
+        limit = int(limit)
+    query = arguments.get("filter") or None
+
+    key = (await notes.version(), style, limit, query)
+    result = prompt_cache.get(key)
+    if result is None:
+        with span("notes.select"):
+            if query:
+                names = await notes.search(query, limit or await notes.count())
+            else:
+                names = await notes.names("", limit)
+        with span("notes.get"):
+            items = await load_prompt_notes(names)
+        with span("prompts.render"):
+            texts = render_note_summary(items, style, PROMPT_MAX_BYTES, PROMPT_CHUNK_BYTES, selected=len(names))
+        result = types.GetPromptResult(
+            description="Summarize the current notes",
+            messages=[
+                types.PromptMessage(role="user", content=types.TextContent(type="text", text=text))
+                for text in texts
+            ],
+        )
+        prompt_cache.put(key, result, sum(len(text.encode("utf-8")) for text in texts))
+    return result
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
@@ -144,9 +493,81 @@ async def handle_list_tools() -> list[types.Tool]:
                 },
                 "required": ["name", "content"],
             },
-        )
+        ),
+        types.Tool(
+            name="bulk-add-notes",
+            description=(
+                "Add many notes at once, either as a 'notes' array or as 'ndjson' "
+                "(one {\"name\", \"content\"} object per line). All notes are "
+                "validated first and stored together, or none are."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "notes": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "content": {"type": "string"},
+                            },
+                            "required": ["name", "content"],
+                        },
+                    },
+                    "ndjson": {"type": "string"},
+                },
+            },
+        ),
     ]
 
+# Largest number of notes accepted by one bulk-add-notes call
+BULK_NOTES_MAX = int(os.environ.get("BULK_NOTES_MAX", "100000"))
+
+def parse_bulk_notes(arguments: dict | None) -> dict[str, str]:
+    """
+    Validate bulk-add-notes arguments and return ``{name: content}``.
+
+    Every item is checked before anything is stored; all problems are
+    reported together in one ``ValueError``.
+    """
+    arguments = arguments or {}
+    if ("notes" in arguments) == ("ndjson" in arguments):
+        raise ValueError("Pass exactly one of 'notes' or 'ndjson'")
+    items = arguments.get("notes")
+    errors = []
+    if items is None:
+        items = []
+        for number, line in enumerate(str(arguments["ndjson"]).splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                errors.append(f"line {number}: invalid JSON ({e})")
+    elif not isinstance(items, list):
+        raise ValueError("'notes' must be an array")
+    if not items and not errors:
+        raise ValueError("No notes given")
+    if len(items) > BULK_NOTES_MAX:
+        raise ValueError(f"Too many notes: {len(items)} (max {BULK_NOTES_MAX})")
+
+    parsed: dict[str, str] = {}
+    for index, item in enumerate(items):
+        name = item.get("name") if isinstance(item, dict) else None
+        content = item.get("content") if isinstance(item, dict) else None
+        if not isinstance(name, str) or not name or not isinstance(content, str) or not content:
+            errors.append(f"item {index}: needs a non-empty string 'name' and 'content'")
+        elif name in parsed:
+            errors.append(f"item {index}: duplicate name '{name}'")
+        else:
+            parsed[name] = content
+    if errors:
+        shown = "; ".join(errors[:10])
+        more = f" (and {len(errors) - 10} more)" if len(errors) > 10 else ""
+        raise ValueError(f"Invalid notes, nothing was added: {shown}{more}")
+    return parsed
+
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: dict | None
@@ -155,6 +576,20 @@ async def handle_call_tool(
     Handle tool execution requests.
     Tools can modify server state and notify clients of changes.
     """
+    if name == "bulk-add-notes":
+        batch = parse_bulk_notes(arguments)
+        # One transaction and one notification for the whole batch
+        await notes.put_many(batch)
+        notifier.list_changed()
+        for note_name in batch:
+            notifier.updated(f"note://internal/{note_name}")
+        return [
+            types.TextContent(
+                type="text",
+                text=f"Added {len(batch)} notes",
+            )
+        ]
+
     if name != "add-note":
         raise ValueError(f"Unknown tool: {name}")
 
@@ -168,10 +603,11 @@ async def handle_call_tool(
         raise ValueError("Missing name or content")
 
     # Update server state
-    notes[note_name] = content
+    await notes.put(note_name, content)
 
-    # Notify clients that resources have changed
-    await server.request_context.session.send_resource_list_changed()
+    # Notify clients in the background once the burst of changes settles
+    notifier.list_changed()
+    notifier.updated(f"note://internal/{note_name}")
 
     return [
         types.TextContent(
@@ -180,10 +616,75 @@ async def handle_call_tool(
         )
     ]
 
+request_seconds = REGISTRY.histogram(
+    "mcp_request_duration_seconds", "Time to handle an MCP request.", ("method", "tool")
+)
+request_errors = REGISTRY.counter(
+    "mcp_request_errors_total", "MCP requests that failed or returned a tool error.", ("method", "tool")
+)
+
+# Opt-in request profiling, off by default: MCP_PROFILE_SAMPLE_RATE profiles
+# that fraction of requests, MCP_PROFILE_REQUESTS=1 honours "profile":
+# "spans" | "cprofile" in a request's _meta. Profiles are written to
+# MCP_PROFILE_DIR and their ID is returned in the result's _meta.
+profiler = Profiler(
+    sample_rate=float(os.environ.get("MCP_PROFILE_SAMPLE_RATE", "0")),
+    allow_requests=os.environ.get("MCP_PROFILE_REQUESTS", "0") == "1",
+    mode=os.environ.get("MCP_PROFILE_MODE", "spans"),
+    directory=os.environ.get("MCP_PROFILE_DIR", "profiles"),
+)
+
+def instrument(handler, tool_names: set[str]):
+    """Wrap a low-level request handler to record its latency and errors, and profile it if asked."""
+    async def measured(req):
+        tool = ""
+        if isinstance(req, types.CallToolRequest):
+            tool = req.params.name if req.params.name in tool_names else "unknown"
+        start = time.perf_counter()
+        try:
+            result = await handler(req)
+        except Exception:
+            request_errors.labels(req.method, tool).inc()
+            raise
+        finally:
+            request_seconds.labels(req.method, tool).observe(time.perf_counter() - start)
+        # Tool failures come back as results with isError set
+        if getattr(result.root, "isError", False):
+            request_errors.labels(req.method, tool).inc()
+        return result
+
+    async def timed(req):
+        if req is None:
+            # The SDK calls list_tools with no request to refresh its tool cache
+            return await handler(req)
+        if not profiler.enabled:
+            return await measured(req)
+        meta = req.params.meta if req.params is not None else None
+        mode = profiler.choose(getattr(meta, "profile", None))
+        if mode is None:
+            return await measured(req)
+        profile = Profile(req.method, mode)
+        try:
+            with profile:
+                result = await measured(req)
+        finally:
+            # Failed requests are saved too
+            await anyio.to_thread.run_sync(profiler.save, profile)
+        result.root.meta = {**(result.root.meta or {}), "profile": profile.id}
+        return result
+    return timed
+
+TOOL_NAMES = {"add-note", "bulk-add-notes"}
+for request_type, handler in list(server.request_handlers.items()):
+    server.request_handlers[request_type] = instrument(handler, TOOL_NAMES)
+
+# Port of the HTTP transport (MCP_SERVER_MODE=http)
+HTTP_PORT = int(os.environ.get("MCP_HTTP_PORT", "8000"))
+
 async def run_http_server():
     """Run the HTTP server with CORS support."""
-    # Set up logging
-    logging.basicConfig(level=logging.DEBUG)
+    # Set up logging (LOG_LEVEL, LOG_QUEUE, LOG_MAX_PAYLOAD)
+    log_level = configure_logging()
     logger = logging.getLogger("mcp-server")
     
     # Create FastAPI app and streams
@@ -202,82 +703,164 @@ async def run_http_server():
         allow_headers=["*"],
     )
 
-    request_in, request_out = create_memory_object_stream()
-    response_in, response_out = create_memory_object_stream()
+    async def run_session(session: Session):
+        await serve(AsyncIterableStream(session.request_receive), session.response_send, session.subscriber)
+
+    # Each SSE client gets its own session with bounded queues into and out
+    # of its own server.run task. When a queue fills up, POSTs are rejected
+    # instead of waiting forever.
+    sessions = SessionRegistry(
+        run_session,
+        request_queue_size=int(os.environ.get("MCP_REQUEST_QUEUE_SIZE", "100")),
+        response_queue_size=int(os.environ.get("MCP_RESPONSE_QUEUE_SIZE", "100")),
+        idle_timeout=float(os.environ.get("MCP_SESSION_IDLE_TIMEOUT", "300")),
+        max_sessions=int(os.environ.get("MCP_MAX_SESSIONS", "10000")),
+    )
 
     @app.post("/mcp")
     async def mcp_endpoint(request: Request):
         logger.debug("Received POST request to /mcp")
+        session_id = request.query_params.get("session_id") or request.headers.get("mcp-session-id")
+        if not session_id:
+            return JSONResponse(
+                {"status": "error", "error": "Missing session_id; open GET /mcp/stream first"},
+                status_code=400,
+            )
+        session = sessions.get(session_id)
+        if session is None:
+            return JSONResponse({"status": "error", "error": f"Unknown session: {session_id}"}, status_code=404)
         data = await request.json()
-        logger.debug(f"Request data: {data}")
-        await request_out.send(data)
+        logger.debug("Request data: %s", Truncated(data))
+        session.touch()
+        response_stats = session.response_send.statistics()
+        if response_stats.max_buffer_size and response_stats.current_buffer_used >= response_stats.max_buffer_size:
+            # Nobody is draining this session's stream, so its loop is stuck
+            session.rejected["response_queue_full"] += 1
+            return JSONResponse(
+                {"status": "error", "error": "Response queue is full; no SSE consumer is reading /mcp/stream"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+        try:
+            message = SessionMessage(types.JSONRPCMessage.model_validate(data))
+        except ValueError as e:
+            return JSONResponse({"status": "error", "error": f"Invalid JSON-RPC message: {e}"}, status_code=400)
+        try:
+            session.request_send.send_nowait(message)
+        except anyio.WouldBlock:
+            session.rejected["request_queue_full"] += 1
+            return JSONResponse(
+                {"status": "error", "error": "Request queue is full"},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
         logger.debug("Sent data to MCP server")
         return {"status": "ok"}
 
+    REGISTRY.gauge("mcp_sessions", "Open MCP sessions.", lambda: sessions.stats()["sessions"])
+    REGISTRY.gauge("mcp_sse_connections", "Sessions with a GET /mcp/stream attached.", lambda: sessions.stats()["connected"])
+    REGISTRY.gauge(
+        "mcp_queue_depth", "Messages waiting in session memory streams.",
+        lambda: {(direction,): sessions.stats()[f"{direction}_depth"] for direction in ("request", "response")},
+        ("direction",),
+    )
+    REGISTRY.gauge(
+        "mcp_rejected_posts", "POSTs rejected because a session queue was full.",
+        lambda: {(reason,): count for reason, count in sessions.stats()["rejected"].items()}, ("reason",),
+    )
+    REGISTRY.gauge("mcp_notifications_sent", "Change notifications sent to clients.", lambda: notifier.stats()["sent"])
+    REGISTRY.gauge(
+        "mcp_cache_lookups", "Prompt cache lookups by result.",
+        lambda: {("prompts", result): prompt_cache.stats()[result] for result in ("hits", "misses")},
+        ("cache", "result"),
+    )
+    REGISTRY.gauge(
+        "mcp_cache_hit_ratio", "Share of prompt cache lookups that were hits.",
+        lambda: {("prompts",): prompt_cache.stats()["hit_ratio"]}, ("cache",),
+    )
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        """Prometheus metrics for this process."""
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    @app.get("/mcp/queues")
+    async def queues_endpoint(session_id: str | None = None):
+        if session_id is None:
+            return {**sessions.stats(), "notifications": notifier.stats(), "prompts": prompt_cache.stats()}
+        session = sessions.get(session_id)
+        if session is None:
+            return JSONResponse({"error": f"Unknown session: {session_id}"}, status_code=404)
+        return session.stats()
+
     @app.get("/mcp/stream")
-    async def stream_endpoint():
-        logger.debug("New SSE connection established")
+    async def stream_endpoint(session_id: str | None = None):
+        if session_id is None:
+            try:
+                session = sessions.create()
+            except RuntimeError as e:
+                return JSONResponse({"error": str(e)}, status_code=503)
+        else:
+            # Reconnect to an existing session
+            session = sessions.get(session_id)
+            if session is None:
+                return JSONResponse({"error": f"Unknown session: {session_id}"}, status_code=404)
+            if session.consumers:
+                return JSONResponse({"error": "Session already has a stream consumer"}, status_code=409)
+        logger.debug("New SSE connection established for session %s", session.id)
+        session.consumers += 1
+
         async def event_generator():
             try:
+                # Tell the client where to POST its messages
+                yield {"event": "endpoint", "data": f"/mcp?session_id={session.id}"}
                 while True:
                     logger.debug("Waiting for message from MCP server...")
-                    message = await response_in.receive()
-                    logger.debug(f"Received message from MCP server: {message}")
+                    message = await session.response_receive.receive()
+                    logger.debug("Received message from MCP server: %s", Truncated(message))
+                    session.touch()
+                    if isinstance(message, SessionMessage):
+                        message = message.message.model_dump_json(by_alias=True, exclude_none=True)
                     yield {"data": message}
-            except asyncio.CancelledError:
-                logger.debug("SSE connection cancelled")
-                pass
+            except (asyncio.CancelledError, anyio.EndOfStream, anyio.ClosedResourceError):
+                logger.debug("SSE connection closed")
             except Exception as e:
-                logger.error(f"Error in event generator: {e}")
+                logger.error("Error in event generator: %s", e)
                 raise
-        return EventSourceResponse(event_generator())
+            finally:
+                session.consumers -= 1
+                session.touch()
+        return EventSourceResponse(event_generator(), headers={"Mcp-Session-Id": session.id})
 
     # Start and run both servers
-    config = uvicorn.Config(app=app, host="0.0.0.0", port=8000, log_level="debug")
+    config = uvicorn.Config(app=app, host="0.0.0.0", port=HTTP_PORT, log_level=log_level)
     server_instance = uvicorn.Server(config)
     logger.debug("Starting uvicorn server...")
 
     try:
-        # Run both servers concurrently
+        # Run the HTTP server alongside the idle session reaper
         await asyncio.gather(
             server_instance.serve(),
-            server.run(
-                AsyncIterableStream(request_in),
-                response_out,
-                InitializationOptions(
-                    server_name="simple-mcp-server",
-                    server_version="0.1.0",
-                    capabilities=server.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
-                    ),
-                ),
-            )
+            sessions.reap_idle(),
         )
     except Exception as e:
-        logger.error(f"Error running servers: {e}")
+        logger.error("Error running servers: %s", e)
         raise
 
 async def main():
     mode = os.environ.get("MCP_SERVER_MODE", "stdio")
-    if mode == "http":
-        print("[simple-mcp-server] Starting MCP HTTP streaming server on http://0.0.0.0:8000/mcp")
-        await run_http_server()
-    else:
-        print("[simple-mcp-server] Starting MCP server in stdio mode...")
-        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-            await server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="simple-mcp-server",
-                    server_version="0.1.0",
-                    capabilities=server.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
-                    ),
-                ),
-            )
+    try:
+        if mode == "http":
+            print(f"[simple-mcp-server] Starting MCP HTTP streaming server on http://0.0.0.0:{HTTP_PORT}/mcp")
+            await run_http_server()
+        else:
+            # stdout carries the protocol in stdio mode
+            print("[simple-mcp-server] Starting MCP server in stdio mode...", file=sys.stderr)
+            async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+                await serve(read_stream, write_stream, Subscriber(write_stream))
+    finally:
+        # Write out notes still buffered by NOTES_WRITE_BEHIND
+        await notes.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
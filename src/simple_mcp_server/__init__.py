@@ -1,9 +1,17 @@
-from . import server
 import asyncio
+import importlib
 
 def main():
     """Main entry point for the package."""
+    from . import server
     asyncio.run(server.main())
 
+def __getattr__(name):
+    # Load the server module on first use, so helpers such as the note store
+    # can be imported without building the app
+    if name == "server":
+        return importlib.import_module(".server", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Optionally expose other important items at package level
-__all__ = ['main', 'server']
\ No newline at end of file
+__all__ = ['main', 'server']
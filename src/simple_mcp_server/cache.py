@@ -0,0 +1,257 @@
+"""Caches for resource metadata, query results and rendered prompts."""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Keyed cache whose entries expire ``ttl`` seconds after they are stored.
+
+    ``get_or_load`` coalesces concurrent misses for the same key so only one
+    loader runs at a time; it is cancelled only when every caller waiting
+    for it is. Loader failures are not cached.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: dict[str, tuple[object, float]] = {}
+        # key -> (loading task, number of callers waiting for it)
+        self._inflight: dict[str, list] = {}
+
+    def get(self, key: str):
+        """Return the cached value, or ``None`` if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def stale(self, key: str):
+        """Return the last value stored for ``key`` even if it has expired, or ``None``."""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key: str, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key: str | None = None):
+        """
+        Drop ``key`` and every ``key:...`` entry derived from it, or every
+        entry when ``key`` is ``None``.
+        """
+        self.invalidations += 1
+        if key is None:
+            self._entries.clear()
+            return
+        prefix = f"{key}:"
+        for cached in [k for k in self._entries if k == key or k.startswith(prefix)]:
+            del self._entries[cached]
+
+    async def get_or_load(self, key: str, loader):
+        """Return the cached value for ``key``, awaiting ``loader()`` on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = self._inflight[key] = [asyncio.ensure_future(self._load(key, loader)), 0]
+        task = inflight[0]
+        inflight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Stop loading once nobody is waiting for the value
+            if inflight[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            inflight[1] -= 1
+
+    async def _load(self, key: str, loader):
+        try:
+            value = await loader()
+        finally:
+            del self._inflight[key]
+        self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+        }
+
+
+class LRUCache:
+    """
+    LRU cache bounded by the total ``size`` callers give for their values.
+
+    Values larger than ``max_bytes`` are not cached. Put a version of the
+    underlying data in the key so stale entries are never hit; they are
+    evicted as newer ones come in.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, dict] = OrderedDict()
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        entry["hits"] += 1
+        entry["last_hit"] = time.time()
+        self.hits += 1
+        return entry["value"]
+
+    def put(self, key: tuple, value, size: int, **fields):
+        """Store ``value`` as taking ``size`` bytes; ``fields`` are kept in its entry."""
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        while self._entries and self.size + size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+        self._entries[key] = {
+            "value": value,
+            "size": size,
+            "hits": 0,
+            "created": time.time(),
+            "last_hit": None,
+            **fields,
+        }
+        self.size += size
+
+    def _drop(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry["size"]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class ResultCache(LRUCache):
+    """
+    LRU cache of encoded query results bounded by their total size in bytes.
+
+    Each entry records the tables it was computed from and their versions at
+    the time; ``invalidate_tables`` drops every entry that read a table whose
+    version changed. Per-entry hit counts are kept for tuning ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes)
+        self.invalidations = 0
+
+    def get(self, key: tuple, versions: dict | None = None) -> str | None:
+        """
+        The cached value for ``key``. With ``versions`` (the current
+        ``{name: version}`` mapping), an entry computed from older table
+        versions is dropped and counts as a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and versions is not None and any(
+            versions.get(table) != version for table, version in entry["tables"].items()
+        ):
+            self._drop(key)
+            self.invalidations += 1
+        return super().get(key)
+
+    def put(self, key: tuple, value: str, tables: dict):
+        """Store ``value`` computed from ``tables`` (a ``{name: version}`` mapping)."""
+        super().put(key, value, len(value.encode("utf-8")), tables=tables)
+
+    def invalidate_tables(self, versions: dict):
+        """Drop entries whose tables are missing from, or differ in, ``versions``."""
+        stale = [
+            key for key, entry in self._entries.items()
+            if any(versions.get(table) != version for table, version in entry["tables"].items())
+        ]
+        for key in stale:
+            self._drop(key)
+        self.invalidations += len(stale)
+
+    def stats(self, top: int = 20) -> dict:
+        hottest = sorted(self._entries.items(), key=lambda item: item[1]["hits"], reverse=True)[:top]
+        return {
+            **super().stats(),
+            "invalidations": self.invalidations,
+            "top_entries": [
+                {
+                    "sql": key[0],
+                    "params": list(key[1]),
+                    "hits": entry["hits"],
+                    "size": entry["size"],
+                    "tables": sorted(entry["tables"]),
+                    "age": time.time() - entry["created"],
+                }
+                for key, entry in hottest
+            ],
+        }
+
+
+class VersionWatcher:
+    """
+    Background task that reports when a polled version changes.
+
+    ``fetch_version`` is awaited every ``interval`` seconds; whenever the
+    value it returns differs from the previous poll, ``on_change(old, new)``
+    is called. Polling happens off the request path, so cache hits never
+    touch the database.
+    """
+
+    def __init__(self, fetch_version, on_change, interval: float):
+        self.fetch_version = fetch_version
+        self.on_change = on_change
+        self.interval = interval
+        self.version = None
+        self._task: asyncio.Task | None = None
+
+    def ensure_started(self):
+        """Start polling on the running event loop if not already doing so."""
+        if self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            # A fresh context, so the poller does not inherit the request that started it
+            self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self):
+        while True:
+            try:
+                version = await self.fetch_version()
+                if self.version is not None and version != self.version:
+                    self.on_change(self.version, version)
+                self.version = version
+            except Exception as e:
+                logger.error("Version poll failed: %s", e)
+            await asyncio.sleep(self.interval)
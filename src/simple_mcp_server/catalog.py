@@ -0,0 +1,107 @@
+"""Bulk MySQL catalog queries used to describe tables as MCP resources."""
+import json
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a MySQL identifier with backticks."""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def fetch_columns(
+    conn, schema: str, after: str = "", limit: int | None = None
+) -> dict[str, list[tuple[str, str]]]:
+    """
+    Fetch ``(column, type)`` pairs for the tables in ``schema``.
+
+    A single information_schema query replaces one ``DESCRIBE`` per table.
+    Tables come back in name order, columns in definition order. With
+    ``limit``, only the first ``limit`` tables named after ``after`` are
+    returned, which lets callers page through the catalog by keyset.
+    """
+    cursor = conn.cursor()
+    try:
+        if limit is None:
+            cursor.execute(
+                "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, ORDINAL_POSITION",
+                (schema,),
+            )
+        else:
+            cursor.execute(
+                "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE FROM information_schema.COLUMNS c "
+                "JOIN (SELECT TABLE_NAME FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = %s AND TABLE_NAME > %s ORDER BY TABLE_NAME LIMIT %s) t "
+                "USING (TABLE_NAME) WHERE c.TABLE_SCHEMA = %s ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION",
+                (schema, after, limit, schema),
+            )
+        columns: dict[str, list[tuple[str, str]]] = {}
+        for table, column, column_type in cursor.fetchall():
+            columns.setdefault(table, []).append((column, column_type))
+        return columns
+    finally:
+        cursor.close()
+
+
+def fetch_samples(conn, columns: dict[str, list[tuple[str, str]]], limit: int = 3) -> dict[str, list[tuple]]:
+    """
+    Fetch up to ``limit`` rows from each table in one ``UNION ALL`` statement.
+
+    Tables have different shapes, so each row is packed into a ``JSON_ARRAY``
+    of its columns and unpacked here.
+    """
+    samples: dict[str, list[tuple]] = {table: [] for table in columns}
+    if not columns:
+        return samples
+    branches = []
+    for table, cols in columns.items():
+        values = ", ".join(quote_identifier(col) for col, _ in cols)
+        branches.append(
+            f"(SELECT %s, JSON_ARRAY({values}) FROM {quote_identifier(table)} LIMIT {int(limit)})"
+        )
+    cursor = conn.cursor()
+    try:
+        cursor.execute(" UNION ALL ".join(branches), tuple(columns))
+        for table, row in cursor.fetchall():
+            samples[table].append(tuple(json.loads(row)))
+        return samples
+    finally:
+        cursor.close()
+
+
+def fetch_schema_version(conn, schema: str) -> tuple:
+    """
+    Return a cheap fingerprint of ``schema`` that changes on DDL and writes.
+
+    Combines the table count, latest ``CREATE_TIME``/``UPDATE_TIME`` from
+    information_schema.TABLES and an order-independent CRC32 sum over every
+    column definition, so renames and column type changes are caught too.
+    """
+    cursor = conn.cursor()
+    try:
+        # MySQL 8 caches information_schema table statistics for a day by default
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        cursor.execute(
+            "SELECT COUNT(*), MAX(CREATE_TIME), MAX(UPDATE_TIME), "
+            "(SELECT SUM(CRC32(CONCAT_WS(':', TABLE_NAME, ORDINAL_POSITION, COLUMN_NAME, COLUMN_TYPE))) "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s) "
+            "FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+            (schema, schema),
+        )
+        return tuple(cursor.fetchone())
+    finally:
+        cursor.close()
+
+
+def fetch_table_versions(conn, schema: str) -> dict[str, tuple]:
+    """Return ``{table: (CREATE_TIME, UPDATE_TIME)}`` for every table in ``schema``."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        cursor.execute(
+            "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = %s",
+            (schema,),
+        )
+        return {table: (created, updated) for table, created, updated in cursor.fetchall()}
+    finally:
+        cursor.close()
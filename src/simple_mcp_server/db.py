@@ -0,0 +1,538 @@
+"""MySQL connection pooling and non-blocking query execution for the MCP handlers."""
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+import anyio
+import anyio.to_thread
+import mysql.connector
+
+from .metrics import REGISTRY
+from .profiling import record
+
+logger = logging.getLogger(__name__)
+
+query_seconds = REGISTRY.histogram(
+    "mysql_query_duration_seconds", "Time spent in MySQL calls made through Database.run.", ("operation",)
+)
+query_errors = REGISTRY.counter(
+    "mysql_query_errors_total", "MySQL calls made through Database.run that raised.", ("operation",)
+)
+acquire_seconds = REGISTRY.histogram(
+    "mysql_pool_acquire_duration_seconds", "Time spent waiting for a pooled MySQL connection."
+)
+queries_killed = REGISTRY.counter(
+    "mysql_queries_killed_total", "MySQL statements stopped with KILL QUERY.", ("reason",)
+)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a MySQL call runs past its deadline; its statement is killed."""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling MySQL while the circuit breaker is open."""
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether ``error`` means MySQL is unreachable or stuck, not that one statement failed."""
+    if isinstance(error, (QueryTimeoutError, PoolExhaustedError, OSError)):
+        return True
+    if isinstance(error, (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError)):
+        return True
+    return isinstance(error, mysql.connector.Error) and 2000 <= (error.errno or 0) < 3000
+
+
+class CircuitBreaker:
+    """
+    Fails MySQL calls fast after ``failure_threshold`` outages in a row, then
+    lets one call through every ``reset_timeout`` seconds. Event loop only.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._probing else "open"
+
+    def check(self):
+        """Raise ``CircuitOpenError`` unless a call may go to MySQL now."""
+        if self.opened_at is None:
+            return
+        waited = time.monotonic() - self.opened_at
+        if self._probing or waited < self.reset_timeout:
+            self.rejected += 1
+            raise CircuitOpenError(
+                f"MySQL is unavailable; retrying in {max(self.reset_timeout - waited, 0):.0f}s"
+            )
+        self._probing = True
+
+    def succeeded(self):
+        if self.opened_at is not None:
+            logger.warning("MySQL is reachable again; closing the circuit breaker")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failed(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(
+                    "MySQL failed %d times in a row; failing calls fast for %ss", self.failures, self.reset_timeout
+                )
+            self.opened_at = time.monotonic()
+
+    def abandoned(self):
+        """The call let through was cancelled before it told us anything."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class _Call:
+    """
+    State shared by one MySQL call's event loop side and worker thread; the
+    side that finishes last releases the limiter token.
+    """
+
+    __slots__ = ("lock", "state", "connection_id", "killed")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # pending -> running -> done, or abandoned by the event loop first
+        self.state = "pending"
+        self.connection_id = None
+        self.killed = False
+
+    def begin(self) -> bool:
+        """Worker thread: claim the call; ``False`` if it was abandoned already."""
+        with self.lock:
+            if self.state == "abandoned":
+                return False
+            self.state = "running"
+            return True
+
+    def attach(self, conn) -> bool:
+        """Worker thread: record the connection; ``False`` if abandoned meanwhile."""
+        with self.lock:
+            if self.state == "abandoned":
+                return False
+            self.connection_id = getattr(conn, "connection_id", None)
+            return True
+
+    def end(self) -> tuple[bool, bool]:
+        """Worker thread: return whether it must release the token, and whether the statement was killed."""
+        with self.lock:
+            abandoned = self.state == "abandoned"
+            self.state = "done"
+            self.connection_id = None
+            return abandoned, self.killed
+
+    def abandon(self) -> tuple[bool, int | None]:
+        """Event loop: return whether it must release the token, and the connection to kill."""
+        with self.lock:
+            if self.state == "done":
+                return True, None
+            running = self.state == "running"
+            self.state = "abandoned"
+            if not running or self.connection_id is None:
+                return not running, None
+            self.killed = True
+            return False, self.connection_id
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of MySQL connections, opened lazily up to ``max_size``.
+    Idle connections above ``min_size`` are closed after ``idle_timeout``.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 1.0,
+        health_check_interval: float = 30.0,
+        connect=None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._connect = connect or mysql.connector.connect
+        self._idle: list[tuple[object, float]] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _open(self):
+        return self._connect(**self.config)
+
+    def _discard(self, conn):
+        try:
+            if getattr(conn, "unread_result", False) and hasattr(conn, "shutdown"):
+                # close() would read the rest of the result first (or fail)
+                conn.shutdown()
+            else:
+                conn.close()
+        except Exception as e:
+            logger.debug("Error closing pooled connection: %s", e)
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.debug("Pooled connection failed health check: %s", e)
+            return False
+
+    def _prune_idle(self, now: float) -> list:
+        """Drop idle connections past ``idle_timeout``; caller holds the lock."""
+        stale = []
+        while len(self._idle) and self._size > self.min_size:
+            conn, idle_since = self._idle[0]
+            if now - idle_since < self.idle_timeout:
+                break
+            self._idle.pop(0)
+            self._size -= 1
+            stale.append(conn)
+        return stale
+
+    def acquire(self, timeout: float | None = None):
+        """Check out a connection, opening a new one if the pool has room."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            waited = exhausted = False
+            with self._cond:
+                if self._closed:
+                    raise PoolExhaustedError("Connection pool is closed")
+                stale = self._prune_idle(time.monotonic())
+                conn = idle_since = None
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        exhausted = not self._idle and self._size >= self.max_size
+            # Closing can block on the network, so it happens outside the lock
+            for stale_conn in stale:
+                self._discard(stale_conn)
+            if exhausted:
+                raise PoolExhaustedError(
+                    f"No MySQL connection available within {timeout}s (max_size={self.max_size})"
+                )
+            if waited:
+                continue
+
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            if time.monotonic() - idle_since < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            # Unhealthy: drop it and try again with the freed slot.
+            self._discard(conn)
+            with self._cond:
+                self._size -= 1
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool, or close it if ``discard`` is set."""
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        """Context manager that checks a connection out and returns it afterwards."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except mysql.connector.Error:
+            # The connection may be in an unknown state; don't reuse it.
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def kill_query(self, connection_id: int):
+        """Send ``KILL QUERY`` for ``connection_id`` over a new connection outside the pool."""
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"KILL QUERY {int(connection_id)}")
+            finally:
+                cursor.close()
+        finally:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Current pool occupancy."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+
+class Database:
+    """
+    Runs MySQL calls on worker threads, at most ``max_concurrency`` at once.
+
+    A call past ``query_timeout`` or cancelled is stopped with ``KILL QUERY``.
+    """
+
+    # Seconds a streamed read's cleanup waits for a killed fetch to return
+    KILL_WAIT = 5.0
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_concurrency: int | None = None,
+        query_timeout: float | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.pool = pool
+        self.limiter = anyio.CapacityLimiter(max_concurrency or pool.max_size)
+        self.query_timeout = query_timeout
+        self.breaker = breaker
+        # Threads are bounded by ``limiter`` tokens, held until a thread is
+        # really done; this one only keeps them off anyio's default limiter.
+        self._threads = anyio.CapacityLimiter(math.inf)
+
+    def _kill(self, connection_id: int, reason: str):
+        """Send ``KILL QUERY`` from a thread of its own, without waiting for it."""
+        def kill():
+            try:
+                self.pool.kill_query(connection_id)
+                logger.warning("Killed MySQL query on connection %s (%s)", connection_id, reason)
+            except Exception as e:
+                logger.error("Could not kill MySQL query on connection %s: %s", connection_id, e)
+        queries_killed.labels(reason).inc()
+        threading.Thread(target=kill, name="mysql-kill", daemon=True).start()
+
+    def _succeeded(self):
+        if self.breaker is not None:
+            self.breaker.succeeded()
+
+    def _failed(self, error: BaseException):
+        if self.breaker is None:
+            return
+        if isinstance(error, anyio.get_cancelled_exc_class()):
+            self.breaker.abandoned()
+        elif is_outage(error):
+            self.breaker.failed()
+        else:
+            # MySQL answered, even if only with an error
+            self.breaker.succeeded()
+
+    async def run(self, func, *args, operation: str | None = None, timeout: float | None = None):
+        """
+        Call ``func(conn, *args)`` on a worker thread and return its result; raises
+        ``QueryTimeoutError`` after ``timeout`` seconds (default ``query_timeout``).
+        """
+        operation = operation or getattr(func, "__name__", "query")
+        timeout = self.query_timeout if timeout is None else timeout
+        if self.breaker is not None:
+            self.breaker.check()
+        call = _Call()
+        loop = asyncio.get_running_loop()
+
+        def work():
+            if not call.begin():
+                return None
+            ended = None
+            try:
+                start = time.perf_counter()
+                conn = self.pool.acquire()
+                acquired = time.perf_counter()
+                acquire_seconds.labels().observe(acquired - start)
+                record("mysql.acquire", start, acquired)
+                if not call.attach(conn):
+                    self.pool.release(conn)
+                    return None
+                broken = False
+                try:
+                    return func(conn, *args)
+                except Exception as e:
+                    query_errors.labels(operation).inc()
+                    # The connection may be in an unknown state; don't reuse it
+                    broken = isinstance(e, mysql.connector.Error)
+                    raise
+                finally:
+                    end = time.perf_counter()
+                    query_seconds.labels(operation).observe(end - acquired)
+                    record(f"mysql {operation}", acquired, end)
+                    # Detach before the connection can be handed to anyone else
+                    ended = call.end()
+                    # Closing is cheaper than draining an unread result
+                    unread = getattr(conn, "unread_result", False)
+                    self.pool.release(conn, discard=broken or ended[1] or unread)
+            finally:
+                abandoned, _ = ended or call.end()
+                if abandoned:
+                    try:
+                        loop.call_soon_threadsafe(self.limiter.release_on_behalf_of, call)
+                    except RuntimeError:
+                        # The event loop is gone; nothing left to release
+                        pass
+
+        with anyio.move_on_after(timeout) as deadline:
+            try:
+                await self.limiter.acquire_on_behalf_of(call)
+            except BaseException as e:
+                if not deadline.cancel_called:
+                    self._failed(e)
+                raise
+            try:
+                result = await anyio.to_thread.run_sync(work, limiter=self._threads, abandon_on_cancel=True)
+            except BaseException as e:
+                release, connection_id = call.abandon()
+                if release:
+                    self.limiter.release_on_behalf_of(call)
+                if connection_id is not None:
+                    self._kill(connection_id, "timeout" if deadline.cancel_called else "cancelled")
+                if not deadline.cancel_called:
+                    self._failed(e)
+                raise
+            self.limiter.release_on_behalf_of(call)
+            self._succeeded()
+            return result
+        error = QueryTimeoutError(f"MySQL call {operation} took longer than {timeout}s")
+        self._failed(error)
+        raise error
+
+    async def fetchall(self, sql: str, params=None) -> list:
+        """Execute a single statement and return all rows."""
+        def query(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        return await self.run(query)
+
+    async def iterate(self, func, *args):
+        """
+        Async-iterate the generator ``func(conn, *args)`` on one pooled connection,
+        with a ``query_timeout`` deadline per item.
+        """
+        if self.breaker is not None:
+            self.breaker.check()
+        done = object()
+        # Held for the iteration, which more than one task may drive
+        borrower = object()
+        await self.limiter.acquire_on_behalf_of(borrower)
+        try:
+            conn = await anyio.to_thread.run_sync(self.pool.acquire)
+        except BaseException as e:
+            self.limiter.release_on_behalf_of(borrower)
+            self._failed(e)
+            raise
+        connection_id = getattr(conn, "connection_id", None)
+        finished = closed = False
+        items = func(conn, *args)
+        # Held while an item is produced, so cleanup waits for a step that
+        # was abandoned mid-fetch instead of using the connection under it
+        busy = threading.Lock()
+
+        def step():
+            with busy:
+                return done if closed else next(items, done)
+
+        try:
+            while True:
+                with anyio.move_on_after(self.query_timeout) as deadline:
+                    try:
+                        item = await anyio.to_thread.run_sync(step, limiter=self._threads, abandon_on_cancel=True)
+                    except BaseException as e:
+                        if isinstance(e, anyio.get_cancelled_exc_class()) and connection_id is not None:
+                            self._kill(connection_id, "timeout" if deadline.cancel_called else "cancelled")
+                        if not deadline.cancel_called:
+                            self._failed(e)
+                        raise
+                if deadline.cancelled_caught:
+                    error = QueryTimeoutError(f"Streaming from MySQL stalled for longer than {self.query_timeout}s")
+                    self._failed(error)
+                    raise error
+                self._succeeded()
+                if item is done:
+                    finished = True
+                    break
+                yield item
+        finally:
+            def cleanup():
+                nonlocal closed
+                # A killed step should return promptly; if MySQL cannot even
+                # be reached to kill it, close the connection under it
+                locked = busy.acquire(timeout=self.KILL_WAIT)
+                try:
+                    closed = True
+                    if not finished and locked:
+                        try:
+                            items.close()
+                        except Exception as e:
+                            logger.debug("Error abandoning streamed result: %s", e)
+                    self.pool.release(conn, discard=not finished)
+                finally:
+                    if locked:
+                        busy.release()
+            try:
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(cleanup)
+            finally:
+                self.limiter.release_on_behalf_of(borrower)
@@ -0,0 +1,294 @@
+"""File resources: mmap reads with byte and line ranges, and the directory index."""
+import bisect
+import json
+import logging
+import mimetypes
+import mmap
+import os
+import posixpath
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Bytes sniffed to tell text from binary when the extension says nothing
+SNIFF_BYTES = 8192
+
+
+def resolve_file_uri(uri: str, root: str) -> tuple[str, str]:
+    """
+    The real path of a ``file://local/<path>`` URI and its normalized path
+    relative to ``root``. Raises ``ValueError`` if the path leaves ``root``.
+    """
+    parts = urlsplit(uri)
+    if parts.scheme != "file" or parts.netloc != "local":
+        raise ValueError(f"Not a local file resource: {uri}")
+    relative = posixpath.normpath(unquote(parts.path).lstrip("/"))
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f"Path escapes the resource directory: {uri}")
+    return path, relative
+
+
+def parse_file_uri(uri: str, root: str) -> dict:
+    """
+    Parse ``file://local/<path>?bytes=<start>-<end>`` or ``?lines=<start>-<end>``.
+
+    Ranges are inclusive and zero-based like HTTP ``Range`` headers; the end
+    may be left out (``bytes=1024-``). Returns keyword arguments for
+    ``read_file``. The path must stay inside ``root``.
+    """
+    path, _ = resolve_file_uri(uri, root)
+    if not os.path.isfile(path):
+        raise ValueError(f"File not found: {uri}")
+
+    query = {key: values[-1] for key, values in parse_qs(urlsplit(uri).query).items()}
+    options: dict = {"path": path}
+    for name in ("bytes", "lines"):
+        value = query.pop(name, None)
+        if value is None:
+            continue
+        start, sep, end = value.partition("-")
+        if not sep or not start.isdigit() or (end and not end.isdigit()) or (end and int(end) < int(start)):
+            raise ValueError(f"'{name}' must look like <start>-<end> or <start>-, got '{value}'")
+        options[f"{name[:-1]}_range"] = (int(start), int(end) if end else None)
+    if "byte_range" in options and "line_range" in options:
+        raise ValueError("Use either 'bytes' or 'lines', not both")
+    if query:
+        raise ValueError(f"Unknown query parameters: {', '.join(sorted(query))}")
+    return options
+
+
+def guess_mime_type(path: str, head: bytes) -> str:
+    """MIME type from the file name, or sniffed from its first bytes."""
+    mime_type, _ = mimetypes.guess_type(path)
+    if mime_type:
+        return mime_type
+    if b"\0" in head:
+        return "application/octet-stream"
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        if e.start < len(head) - 3:
+            return "application/octet-stream"
+    return "text/plain"
+
+
+def file_mime_type(path: str) -> str:
+    with open(path, "rb") as f:
+        return guess_mime_type(path, f.read(SNIFF_BYTES))
+
+
+def is_text(mime_type: str) -> bool:
+    return mime_type.startswith("text/") or mime_type in (
+        "application/json", "application/xml", "application/javascript", "application/x-ndjson",
+    )
+
+
+def _line_span(data, start: int, end: int | None) -> tuple[int, int]:
+    """Byte offsets of lines ``start`` through ``end`` (inclusive) in ``data``."""
+    begin = 0
+    for _ in range(start):
+        newline = data.find(b"\n", begin)
+        if newline < 0:
+            return len(data), len(data)
+        begin = newline + 1
+    if end is None:
+        return begin, len(data)
+    stop = begin
+    for _ in range(end - start + 1):
+        newline = data.find(b"\n", stop)
+        if newline < 0:
+            return begin, len(data)
+        stop = newline + 1
+    return begin, stop
+
+
+def read_file(
+    path: str,
+    byte_range: tuple[int, int | None] | None = None,
+    line_range: tuple[int, int | None] | None = None,
+    max_bytes: int = 10 * 1024 * 1024,
+) -> tuple[str | bytes, str]:
+    """
+    Return ``(content, mime_type)`` for a whole file or a range of it.
+
+    The file is memory-mapped, so only the pages covering the range are
+    read, and line ranges are found by scanning for newlines without
+    decoding. Text comes back as ``str``, anything else as ``bytes``.
+    Raises ``ValueError`` if the selected range is larger than ``max_bytes``.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        # mmap cannot map an empty file
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            mime_type = guess_mime_type(path, data[:SNIFF_BYTES])
+            if byte_range is not None:
+                begin = min(byte_range[0], size)
+                stop = size if byte_range[1] is None else min(byte_range[1] + 1, size)
+            elif line_range is not None:
+                begin, stop = _line_span(data, *line_range)
+            else:
+                begin, stop = 0, size
+            if stop - begin > max_bytes:
+                raise ValueError(
+                    f"Requested {stop - begin} bytes, over the {max_bytes} byte limit; "
+                    "read a smaller range with ?bytes= or ?lines="
+                )
+            content = data[begin:stop]
+        finally:
+            if size:
+                data.close()
+    if is_text(mime_type):
+        return content.decode("utf-8", errors="replace"), mime_type
+    return content, mime_type
+
+
+def load_file_resource(uri: str, root: str, max_bytes: int) -> tuple[str | bytes, str]:
+    """``read_file`` for a ``file://local/...`` resource URI under ``root``."""
+    return read_file(**parse_file_uri(uri, root), max_bytes=max_bytes)
+
+
+class DirectoryIndex:
+    """
+    Sorted index of the files under ``root``, recursively, as relative
+    POSIX paths.
+
+    ``refresh`` stats each known directory and only re-reads those whose
+    mtime moved (adding, removing or renaming an entry changes it), so an
+    unchanged tree of any size costs one stat per directory. The index is
+    saved to ``cache_path`` as JSON and reloaded on start, so a restart
+    only re-reads directories that changed while the server was down.
+    """
+
+    # Directories modified this recently are re-read on the next refresh,
+    # since a change in the same mtime tick as the scan would be missed.
+    RACY_NS = 2_000_000_000
+
+    def __init__(self, root: str, cache_path: str | None = None):
+        self.root = os.path.realpath(root)
+        self.cache_path = cache_path
+        self.names: list[str] = []
+        self.generation = 0
+        # Whether refresh has run at all; generation stays 0 for an empty tree
+        self.refreshed = False
+        self._files: dict[str, set[str]] = {}
+        self._dirs: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+
+    def _load(self):
+        self._loaded = True
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable file index %s: %s", self.cache_path, e)
+            return
+        if saved.get("root") != self.root:
+            return
+        self._dirs = saved["dirs"]
+        self._files = {d: set(names) for d, names in saved["files"].items()}
+        # Rebuild names from the loaded entries on this refresh
+        self._dirty = True
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({
+                    "root": self.root,
+                    "dirs": self._dirs,
+                    "files": {d: sorted(names) for d, names in self._files.items()},
+                }, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not save file index %s: %s", self.cache_path, e)
+
+    def _forget(self, directory: str):
+        prefix = f"{directory}/" if directory else ""
+        for known in [d for d in self._dirs if d == directory or d.startswith(prefix)]:
+            del self._dirs[known]
+            self._files.pop(known, None)
+        self._dirty = True
+
+    def _scan(self, directory: str, started_ns: int):
+        """Re-read ``directory`` (relative to root) and any new subdirectories."""
+        path = os.path.join(self.root, directory)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                entries = list(entries)
+        except OSError:
+            self._forget(directory)
+            return
+        self._dirs[directory] = -1 if mtime_ns > started_ns - self.RACY_NS else mtime_ns
+        files, subdirs = set(), set()
+        for entry in entries:
+            name = f"{directory}/{entry.name}" if directory else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.add(name)
+                elif entry.is_file():
+                    files.add(entry.name)
+            except OSError:
+                continue
+        self._files[directory] = files
+        self._dirty = True
+        for known in [d for d in self._dirs if d != directory and d.rpartition("/")[0] == directory]:
+            if known not in subdirs:
+                self._forget(known)
+        for subdir in subdirs:
+            if subdir not in self._dirs:
+                self._scan(subdir, started_ns)
+
+    def refresh(self) -> bool:
+        """Bring the index up to date; return whether the set of files changed."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            started_ns = time.time_ns()
+            if not os.path.isdir(self.root):
+                if self._dirs:
+                    self._forget("")
+            elif "" not in self._dirs:
+                self._scan("", started_ns)
+            for directory, mtime_ns in list(self._dirs.items()):
+                if directory not in self._dirs:
+                    continue
+                try:
+                    current = os.stat(os.path.join(self.root, directory)).st_mtime_ns
+                except OSError:
+                    self._forget(directory)
+                    continue
+                if current != mtime_ns:
+                    self._scan(directory, started_ns)
+            self.refreshed = True
+            if not self._dirty:
+                return False
+            self._dirty = False
+            self._save()
+            names = sorted(
+                f"{directory}/{name}" if directory else name
+                for directory, files in self._files.items() for name in files
+            )
+            if names == self.names:
+                return False
+            self.names = names
+            self.generation += 1
+            return True
+
+    def page(self, after: str = "", limit: int | None = None) -> list[str]:
+        """Indexed paths sorted after ``after``, at most ``limit`` of them."""
+        names = self.names
+        start = bisect.bisect_right(names, after)
+        return names[start:] if limit is None else names[start:start + limit]
@@ -0,0 +1,74 @@
+"""Logging setup: level from the environment, truncated payloads, optional queue handler."""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+# Longest logged payload, in characters; 0 logs payloads in full
+MAX_PAYLOAD = int(os.environ.get("LOG_MAX_PAYLOAD", "500"))
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class Truncated:
+    """
+    Lazily formatted log argument, cut to ``limit`` (default ``MAX_PAYLOAD``) characters.
+
+    Pass it as a ``%s`` argument so the value is only turned into a string
+    when the record is actually emitted.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: int | None = None):
+        self.value = value
+        self.limit = MAX_PAYLOAD if limit is None else limit
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if 0 < self.limit < len(text):
+            return f"{text[:self.limit]}... ({len(text) - self.limit} more chars)"
+        return text
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def configure_logging(level: str | None = None, use_queue: bool | None = None, stream=None) -> str:
+    """
+    Configure the root logger and return the level name for uvicorn.
+
+    ``LOG_LEVEL`` sets the level (default ``INFO``). With ``LOG_QUEUE=1``
+    records are handed to a ``QueueHandler`` and written by a background
+    thread, so slow log I/O never blocks the event loop.
+    """
+    global _listener
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    if use_queue is None:
+        use_queue = os.environ.get("LOG_QUEUE", "0") == "1"
+
+    _stop_listener()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if use_queue:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        handler = logging.handlers.QueueHandler(records)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return level.lower()
@@ -0,0 +1,213 @@
+"""Prometheus-style metrics: counters and histograms, rendered for GET /metrics."""
+import math
+import threading
+import weakref
+from bisect import bisect_left
+
+# Latency buckets in seconds, from half a millisecond to ten seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _ShardOwner:
+    """Held only by a thread's ``threading.local``; collected when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    """
+    Values kept in one list per writing thread, summed when scraped.
+
+    Each thread only ever updates its own shard, so recording takes no lock
+    and threads never lose each other's updates; the event loop and every
+    worker thread get a shard on first use. When a thread exits, its shard
+    is folded into a base total, so short-lived threads don't pile up shards.
+    """
+
+    __slots__ = ("_size", "_local", "_shards", "_base", "_lock")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: dict[int, list] = {}
+        self._base = [0] * size
+        # Taken when shards come and go and when scraping, never when recording
+        self._lock = threading.Lock()
+
+    def _new_shard(self) -> list:
+        shard = [0] * self._size
+        owner = self._local.owner = _ShardOwner()
+        with self._lock:
+            self._shards[id(shard)] = shard
+        weakref.finalize(owner, self._retire, shard)
+        self._local.shard = shard
+        return shard
+
+    def _retire(self, shard: list):
+        with self._lock:
+            del self._shards[id(shard)]
+            for i, value in enumerate(shard):
+                self._base[i] += value
+
+    def _totals(self) -> list:
+        with self._lock:
+            totals = list(self._base)
+            for shard in self._shards.values():
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._totals()[0]
+
+
+class Histogram(_Sharded):
+    """Observations counted per bucket (``le`` upper bounds), plus their sum."""
+
+    __slots__ = ("buckets",)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per bucket, one for +Inf, one for the sum
+        super().__init__(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        # Inlined rather than a helper call: this runs on every request
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Cumulative counts per bucket (the last is +Inf) and the sum."""
+        totals = self._totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric with one child per combination of label values."""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple, factory):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: dict[tuple, object] = {}
+
+    def labels(self, *values):
+        try:
+            return self._children[values]
+        except KeyError:
+            pass
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        # setdefault keeps the first child if two threads race here
+        return self._children.setdefault(values, self._factory())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            if isinstance(child, Histogram):
+                counts, total = child.snapshot()
+                for bound, count in zip((*child.buckets, math.inf), counts):
+                    le = 'le="%s"' % _format_value(float(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {count}")
+                labels = _format_labels(self.labelnames, values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {counts[-1]}")
+            else:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Gauge:
+    """
+    Values read from ``callback`` at scrape time: a number, or a mapping of
+    label-value tuples to numbers when ``labelnames`` is given.
+    """
+
+    def __init__(self, name: str, help: str, callback, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> list[str]:
+        value = self.callback()
+        samples = value.items() if self.labelnames else [((), value)]
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"] + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(sample)}"
+            for labels, sample in samples
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric | Gauge] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Metric:
+        return self._register(Metric(name, help, "counter", labelnames, Counter))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets=DEFAULT_BUCKETS) -> Metric:
+        return self._register(Metric(name, help, "histogram", labelnames, lambda: Histogram(buckets)))
+
+    def gauge(self, name: str, help: str, callback, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help, callback, labelnames))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# Registry shared by the modules of one server process
+REGISTRY = Registry()
+
+# Content type of Registry.render output
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
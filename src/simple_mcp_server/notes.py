@@ -0,0 +1,441 @@
+"""Note storage backends: in memory, SQLite or a MySQL table, with optional write-behind batching."""
+import abc
+import asyncio
+import functools
+import heapq
+import logging
+import sqlite3
+import threading
+
+import anyio
+
+from .catalog import quote_identifier
+
+logger = logging.getLogger(__name__)
+
+
+class NoteStore(abc.ABC):
+    """
+    Interface shared by the note backends. Every method is a coroutine.
+
+    Names are compared by code point in every backend, so the last name of
+    one ``names()`` page can be passed as ``after`` to get the next one.
+    """
+
+    @abc.abstractmethod
+    async def get(self, name: str) -> str | None:
+        """The content of note ``name``, or ``None`` if there is none."""
+
+    async def put(self, name: str, content: str):
+        await self.put_many({name: content})
+
+    @abc.abstractmethod
+    async def put_many(self, notes: dict[str, str]):
+        """Store all of ``notes`` atomically, replacing existing ones."""
+
+    @abc.abstractmethod
+    async def names(self, after: str = "", limit: int | None = None) -> list[str]:
+        """Names greater than ``after`` in order, at most ``limit`` of them."""
+
+    @abc.abstractmethod
+    async def items(self) -> list[tuple[str, str]]:
+        """Every ``(name, content)`` pair, ordered by name."""
+
+    @abc.abstractmethod
+    async def search(self, query: str, limit: int = 20) -> list[str]:
+        """Names of notes whose name or content matches ``query``, best first."""
+
+    @abc.abstractmethod
+    async def count(self) -> int:
+        """How many notes there are."""
+
+    @abc.abstractmethod
+    async def version(self):
+        """
+        A value that changes whenever notes are written, for keying caches
+        of anything derived from them. Writes by other processes are seen
+        where the backend can tell.
+        """
+
+    async def flush(self):
+        """Write out anything buffered."""
+
+    async def close(self):
+        await self.flush()
+
+
+class MemoryNoteStore(NoteStore):
+    """Notes in a process-local dict. Lost on restart and not shared between workers."""
+
+    def __init__(self, notes: dict[str, str] | None = None):
+        self._notes = dict(notes or {})
+        self._writes = 0
+
+    async def get(self, name):
+        return self._notes.get(name)
+
+    async def put_many(self, notes):
+        self._notes.update(notes)
+        self._writes += 1
+
+    async def names(self, after="", limit=None):
+        names = (name for name in self._notes if name > after)
+        return sorted(names) if limit is None else heapq.nsmallest(limit, names)
+
+    async def items(self):
+        return sorted(self._notes.items())
+
+    async def search(self, query, limit=20):
+        words = [word.rstrip("*").lower() for word in query.split()]
+        return [
+            name for name, content in sorted(self._notes.items())
+            if all(word in name.lower() or word in content.lower() for word in words)
+        ][:limit]
+
+    async def count(self):
+        return len(self._notes)
+
+    async def version(self):
+        return self._writes
+
+
+class SQLiteNoteStore(NoteStore):
+    """
+    Notes in a SQLite database in WAL mode, so several processes can share
+    one file and read while another writes.
+
+    ``name`` has a unique index for ordered keyset listing, and an FTS5
+    table with 2- and 3-character prefix indexes covers names and content
+    for ``search``. Queries run on a worker thread.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS notes ("
+        "id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, content TEXT NOT NULL)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+        "name, content, content='notes', content_rowid='id', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN "
+        "INSERT INTO notes_fts(rowid, name, content) VALUES (new.id, new.name, new.content); END",
+        "CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN "
+        "INSERT INTO notes_fts(notes_fts, rowid, name, content) "
+        "VALUES ('delete', old.id, old.name, old.content); END",
+        "CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN "
+        "INSERT INTO notes_fts(notes_fts, rowid, name, content) "
+        "VALUES ('delete', old.id, old.name, old.content); "
+        "INSERT INTO notes_fts(rowid, name, content) VALUES (new.id, new.name, new.content); END",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are only the ones opened explicitly
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    def _locked(self, func, *args):
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            return func(self._conn, *args)
+
+    async def _run(self, func, *args):
+        return await anyio.to_thread.run_sync(functools.partial(self._locked, func, *args))
+
+    async def get(self, name):
+        def get(conn):
+            row = conn.execute("SELECT content FROM notes WHERE name = ?", (name,)).fetchone()
+            return row[0] if row else None
+        return await self._run(get)
+
+    async def put_many(self, notes):
+        def put_many(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO notes (name, content) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET content = excluded.content",
+                    notes.items(),
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        await self._run(put_many)
+        self._writes += 1
+
+    async def names(self, after="", limit=None):
+        def names(conn):
+            return [row[0] for row in conn.execute(
+                "SELECT name FROM notes WHERE name > ? ORDER BY name LIMIT ?",
+                (after, -1 if limit is None else limit),
+            )]
+        return await self._run(names)
+
+    async def items(self):
+        return await self._run(lambda conn: conn.execute(
+            "SELECT name, content FROM notes ORDER BY name"
+        ).fetchall())
+
+    async def search(self, query, limit=20):
+        def search(conn):
+            try:
+                rows = conn.execute(
+                    "SELECT name FROM notes_fts WHERE notes_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}") from e
+            return [row[0] for row in rows]
+        return await self._run(search)
+
+    async def count(self):
+        return await self._run(lambda conn: conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0])
+
+    async def version(self):
+        # data_version only moves when another connection commits
+        return await self._run(lambda conn: (
+            self._writes, conn.execute("PRAGMA data_version").fetchone()[0]
+        ))
+
+    async def close(self):
+        def close(conn):
+            conn.close()
+            self._conn = None
+        if self._conn is not None:
+            await self._run(close)
+
+
+class MySQLNoteStore(NoteStore):
+    """
+    Notes in a table of the MySQL database behind ``database``.
+
+    The table is created on first use with a binary-collated primary key on
+    ``name`` (so ordering matches the other backends) and a FULLTEXT index
+    over name and content; ``search`` uses boolean mode, where ``term*``
+    matches prefixes.
+    """
+
+    def __init__(self, database, table: str = "mcp_notes"):
+        self.database = database
+        self.name = table
+        self.table = quote_identifier(table)
+        self._ready = False
+        self._writes = 0
+
+    def _transaction(self, conn, func, *args):
+        # Commit after reads too, so a pooled connection never keeps reading
+        # from an old snapshot.
+        cursor = conn.cursor()
+        try:
+            if not self._ready:
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "name VARCHAR(255) NOT NULL PRIMARY KEY, content MEDIUMTEXT NOT NULL, "
+                    "FULLTEXT KEY ft_notes (name, content)"
+                    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin"
+                )
+                self._ready = True
+            result = func(cursor, *args)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    async def _run(self, func, *args):
+        return await self.database.run(self._transaction, func, *args, operation=f"notes.{func.__name__}")
+
+    async def get(self, name):
+        def get(cursor):
+            cursor.execute(f"SELECT content FROM {self.table} WHERE name = %s", (name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        return await self._run(get)
+
+    async def put_many(self, notes):
+        def put_many(cursor):
+            cursor.executemany(
+                f"INSERT INTO {self.table} (name, content) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE content = VALUES(content)",
+                list(notes.items()),
+            )
+        await self._run(put_many)
+        self._writes += 1
+
+    async def names(self, after="", limit=None):
+        def names(cursor):
+            sql = f"SELECT name FROM {self.table} WHERE name > %s ORDER BY name"
+            params: tuple = (after,)
+            if limit is not None:
+                sql += " LIMIT %s"
+                params += (limit,)
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        return await self._run(names)
+
+    async def items(self):
+        def items(cursor):
+            cursor.execute(f"SELECT name, content FROM {self.table} ORDER BY name")
+            return cursor.fetchall()
+        return await self._run(items)
+
+    async def search(self, query, limit=20):
+        def search(cursor):
+            cursor.execute(
+                f"SELECT name FROM {self.table} WHERE MATCH(name, content) AGAINST (%s IN BOOLEAN MODE) LIMIT %s",
+                (query, limit),
+            )
+            return [row[0] for row in cursor.fetchall()]
+        return await self._run(search)
+
+    async def count(self):
+        def count(cursor):
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+        return await self._run(count)
+
+    async def version(self):
+        # UPDATE_TIME has one-second resolution, so a write by another
+        # process in the same second as the last check can go unseen
+        def version(cursor):
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            cursor.execute(
+                "SELECT UPDATE_TIME FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                (self.name,),
+            )
+            row = cursor.fetchone()
+            return self._writes, row[0] if row else None
+        return await self._run(version)
+
+
+class WriteBehindNoteStore(NoteStore):
+    """
+    Buffers writes and commits them to ``store`` in one ``put_many``.
+
+    A batch is written ``delay`` seconds after its first note, or as soon
+    as ``max_batch`` notes are waiting. Reads see buffered notes right away;
+    notes still buffered when the process dies are lost.
+    """
+
+    def __init__(self, store: NoteStore, delay: float = 0.05, max_batch: int = 1000):
+        self.store = store
+        self.delay = delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self._writes = 0
+        self._pending: dict[str, str] = {}
+        self._flushing: dict[str, str] = {}
+        self._flush_lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _buffered(self) -> dict[str, str]:
+        return {**self._flushing, **self._pending}
+
+    async def get(self, name):
+        for buffer in (self._pending, self._flushing):
+            if name in buffer:
+                return buffer[name]
+        return await self.store.get(name)
+
+    async def put_many(self, notes):
+        self._pending.update(notes)
+        self._writes += 1
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush_later)
+
+    def _flush_later(self):
+        self._timer = None
+        task = asyncio.ensure_future(self._flush_logged())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Note write-behind flush failed: %s", e)
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush_later)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            try:
+                await self.store.put_many(self._flushing)
+                self.batches += 1
+            except BaseException:
+                # Retry on the next flush, unless a newer write replaced the note
+                self._pending = {**self._flushing, **self._pending}
+                raise
+            finally:
+                self._flushing = {}
+
+    async def names(self, after="", limit=None):
+        stored = await self.store.names(after, limit)
+        merged = sorted(set(stored).union(name for name in self._buffered() if name > after))
+        return merged if limit is None else merged[:limit]
+
+    async def items(self):
+        notes = dict(await self.store.items())
+        notes.update(self._buffered())
+        return sorted(notes.items())
+
+    async def search(self, query, limit=20):
+        await self.flush()
+        return await self.store.search(query, limit)
+
+    async def count(self):
+        await self.flush()
+        return await self.store.count()
+
+    async def version(self):
+        return self._writes, await self.store.version()
+
+    async def close(self):
+        await self.flush()
+        await self.store.close()
+
+
+def open_note_store(
+    spec: str, database=None, write_behind: float = 0, max_batch: int = 1000
+) -> NoteStore:
+    """
+    Open the note store described by ``spec``.
+
+    ``spec`` is ``memory``, ``sqlite:///<path>`` or ``mysql[:<table>]`` (a
+    table next to the data behind ``database``). With ``write_behind`` > 0
+    writes are batched by a ``WriteBehindNoteStore`` with that delay.
+    """
+    if spec == "memory":
+        store: NoteStore = MemoryNoteStore()
+    elif spec.startswith("sqlite:///"):
+        store = SQLiteNoteStore(spec[len("sqlite:///"):])
+    elif spec == "mysql" or spec.startswith("mysql:"):
+        if database is None:
+            raise ValueError("The mysql note store needs a MySQL database")
+        store = MySQLNoteStore(database, spec.partition(":")[2] or "mcp_notes")
+    else:
+        raise ValueError(f"Unknown note store '{spec}', expected memory, sqlite:///<path> or mysql[:<table>]")
+    if write_behind > 0:
+        store = WriteBehindNoteStore(store, write_behind, max_batch)
+    return store
@@ -0,0 +1,197 @@
+"""Opt-in request profiling: span timelines and cProfile dumps written to disk."""
+import contextvars
+import cProfile
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "spans" records the timed sections below; "cprofile" also runs cProfile
+MODES = ("spans", "cprofile")
+
+_current: contextvars.ContextVar["Profile | None"] = contextvars.ContextVar("profile", default=None)
+_ids = itertools.count(1)
+# cProfile hooks the whole thread, so only one request runs it at a time
+_cprofile_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile: "Profile", name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.add(self.name, self.start, time.perf_counter())
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str):
+    """Time the ``with`` block as ``name`` if the current request is profiled."""
+    profile = _current.get()
+    return _NO_SPAN if profile is None else _Span(profile, name)
+
+
+def record(name: str, start: float, end: float):
+    """Add an already timed section (``perf_counter`` values) to the current profile."""
+    profile = _current.get()
+    if profile is not None:
+        profile.add(name, start, end)
+
+
+class Profile:
+    """
+    The spans of one request, and its cProfile stats in ``cprofile`` mode.
+
+    Use it as a context manager around the request; spans recorded by the
+    request's tasks and worker threads (which inherit its context) end up
+    here. cProfile only sees the event loop thread, including any other
+    requests running at the same time, so spans are what attribute time to
+    MySQL calls made on worker threads.
+    """
+
+    def __init__(self, label: str, mode: str = "spans"):
+        self.label = label
+        self.mode = mode
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_ids)}"
+        self.spans: list[tuple[str, float, float, str]] = []
+        self.profiler: cProfile.Profile | None = None
+        self.start = self.duration = 0.0
+
+    def add(self, name: str, start: float, end: float):
+        # list.append is atomic, so worker threads can add spans directly
+        self.spans.append((name, start - self.start, end - start, threading.current_thread().name))
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        if self.mode == "cprofile":
+            if _cprofile_lock.acquire(blocking=False):
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            else:
+                logger.info("Profile %s: cProfile already running for another request; recording spans only", self.id)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            _cprofile_lock.release()
+        _current.reset(self._token)
+
+    def totals(self) -> dict[str, dict]:
+        """Call count and total seconds per span name, longest first."""
+        totals: dict[str, dict] = {}
+        for name, _, seconds, _ in self.spans:
+            entry = totals.setdefault(name, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "mode": self.mode,
+            "seconds": self.duration,
+            "totals": self.totals(),
+            "spans": [
+                {"name": name, "start": start, "seconds": seconds, "thread": thread}
+                for name, start, seconds, thread in sorted(self.spans, key=lambda s: s[1])
+            ],
+            "cprofile": f"{self.id}.prof" if self.profiler is not None else None,
+        }
+
+    def save(self, directory: str) -> str:
+        """
+        Write ``<id>.json`` (the span timeline) and, with cProfile stats,
+        ``<id>.prof`` (for ``pstats`` or snakeviz) to ``directory``.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if self.profiler is not None:
+            self.profiler.dump_stats(os.path.join(directory, f"{self.id}.prof"))
+        path = os.path.join(directory, f"{self.id}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        return path
+
+
+class Profiler:
+    """
+    Decides which requests are profiled and where their profiles go.
+
+    A request is profiled when it asks to be (a header or ``_meta`` field,
+    honoured only with ``allow_requests``) or when it is picked by
+    ``sample_rate``, the fraction of all requests profiled in ``mode``.
+    With both off, ``choose`` returns ``None`` without touching the random
+    number generator and requests pay nothing else.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, allow_requests: bool = False, mode: str = "spans",
+                 directory: str = "profiles"):
+        if mode not in MODES:
+            raise ValueError(f"Profile mode must be one of {', '.join(MODES)}, got '{mode}'")
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f"Profile sample rate must be between 0 and 1, got {sample_rate}")
+        self.sample_rate = sample_rate
+        self.allow_requests = allow_requests
+        self.mode = mode
+        self.directory = directory
+
+    @property
+    def enabled(self) -> bool:
+        return self.allow_requests or self.sample_rate > 0
+
+    def choose(self, requested: str | None = None) -> str | None:
+        """The mode to profile a request in, or ``None`` to not profile it."""
+        if requested and self.allow_requests:
+            return requested if requested in MODES else self.mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def save(self, profile: Profile) -> str:
+        """Write ``profile`` to the profile directory and log where its time went."""
+        path = profile.save(self.directory)
+        logger.info(
+            "Profiled %s in %.1f ms (%s): %s", profile.label, profile.duration * 1e3, path,
+            ", ".join(
+                f"{name} {entry['seconds'] * 1e3:.1f} ms x{entry['calls']}"
+                for name, entry in itertools.islice(profile.totals().items(), 5)
+            ) or "no spans",
+        )
+        return path
+
+    def load(self, profile_id: str) -> dict | None:
+        """A saved span timeline by ID, or ``None`` if there is none."""
+        if not re.fullmatch(r"[0-9A-Za-z-]+", profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,58 @@
+"""Rendering of the summarize-notes prompt within a byte budget."""
+
+
+def truncate_utf8(text: str, max_bytes: int, marker: str = "…") -> str:
+    """``text`` cut to at most ``max_bytes`` UTF-8 bytes, ending in ``marker`` if cut."""
+    data = text.encode("utf-8")
+    if len(data) <= max_bytes:
+        return text
+    keep = max(max_bytes - len(marker.encode("utf-8")), 0)
+    return data[:keep].decode("utf-8", errors="ignore") + marker
+
+
+def note_line(name: str, content: str, chunk_bytes: int = 32_768) -> str:
+    """The line listing one note in the prompt, cut to ``chunk_bytes``."""
+    return truncate_utf8(f"- {name}: {content}", chunk_bytes)
+
+
+def render_note_summary(
+    items: list[tuple[str, str]], style: str = "brief", max_bytes: int = 200_000, chunk_bytes: int = 32_768,
+    selected: int | None = None,
+) -> list[str]:
+    """
+    Render ``(name, content)`` pairs as the texts of the summarize-notes
+    prompt messages.
+
+    Note lines are capped at ``max_bytes`` in total; notes past the budget
+    are left out and counted in the last message. ``selected`` is the number
+    of notes chosen when ``items`` only holds the first of them. Lines are packed into
+    chunks of at most ``chunk_bytes`` (a longer note is truncated). One
+    chunk gives a single message; more give one message per chunk plus a
+    closing message asking for the part summaries to be combined.
+    """
+    detail = " Give extensive details." if style == "detailed" else ""
+    chunks: list[list[str]] = []
+    chunk_size = total = shown = 0
+    for name, content in items:
+        line = note_line(name, content, chunk_bytes)
+        size = len(line.encode("utf-8")) + 1
+        if total + size > max_bytes:
+            break
+        if not chunks or chunk_size + size > chunk_bytes:
+            chunks.append([])
+            chunk_size = 0
+        chunks[-1].append(line)
+        chunk_size += size
+        total += size
+        shown += 1
+
+    omitted = (len(items) if selected is None else selected) - shown
+    note = f"\n\n({omitted} more notes left out to stay within the size limit.)" if omitted else ""
+    if len(chunks) <= 1:
+        lines = "\n".join(chunks[0]) if chunks else ""
+        return [f"Here are the current notes to summarize:{detail}\n\n{lines}{note}"]
+    parts = len(chunks)
+    return [
+        f"Here is part {i} of {parts} of the current notes. Summarize this part:{detail}\n\n" + "\n".join(lines)
+        for i, lines in enumerate(chunks, 1)
+    ] + [f"Combine the summaries of all {parts} parts into one summary of the notes.{detail}{note}"]
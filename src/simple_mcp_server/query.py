@@ -0,0 +1,189 @@
+"""Read-only SQL execution for the run-query tool."""
+import json
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+# String literals, quoted identifiers and comments, in the order MySQL's
+# lexer would see them. Comments are dropped; everything else is kept.
+_TOKEN = re.compile(
+    r"""
+    (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    |(?P<ident>`(?:[^`]|``)*`)
+    |(?P<comment>/\*.*?\*/|(?:--\s|\#)[^\n]*)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_FORBIDDEN = re.compile(
+    r"\bINTO\b|\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\b", re.IGNORECASE
+)
+# Functions whose result differs between runs of the same statement
+_NONDETERMINISTIC = re.compile(
+    r"\b(?:NOW|SYSDATE|CURDATE|CURTIME|CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|"
+    r"LOCALTIME|LOCALTIMESTAMP|UNIX_TIMESTAMP|UTC_DATE|UTC_TIME|UTC_TIMESTAMP|RAND|UUID|"
+    r"UUID_SHORT|CONNECTION_ID|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT|USER|CURRENT_USER|SLEEP)\b",
+    re.IGNORECASE,
+)
+
+
+def _split(sql: str) -> list[tuple[str, str]]:
+    """Split ``sql`` into ``(kind, text)`` pieces: "code", "string", "ident" or "comment"."""
+    pieces = []
+    pos = 0
+    for m in _TOKEN.finditer(sql):
+        if m.start() > pos:
+            pieces.append(("code", sql[pos:m.start()]))
+        pieces.append((m.lastgroup, m.group()))
+        pos = m.end()
+    if pos < len(sql):
+        pieces.append(("code", sql[pos:]))
+    return pieces
+
+
+def validate_select(sql: str) -> str:
+    """
+    Return ``sql`` without comments, or raise ``ValueError`` unless it is a
+    single ``SELECT`` without ``INTO`` or a locking clause.
+    """
+    cleaned, skeleton = [], []
+    for kind, text in _split(sql):
+        if kind == "code":
+            cleaned.append(text)
+            skeleton.append(text)
+        elif kind == "comment":
+            cleaned.append(" ")
+            skeleton.append(" ")
+        else:
+            cleaned.append(text)
+            skeleton.append(" ? ")
+    cleaned_sql = "".join(cleaned).strip().rstrip(";").strip()
+    shape = "".join(skeleton).strip().rstrip(";")
+
+    if not re.match(r"SELECT\b", cleaned_sql, re.IGNORECASE):
+        raise ValueError("Only SELECT statements are allowed")
+    if ";" in shape:
+        raise ValueError("Only a single statement is allowed")
+    if "/*" in shape or "*/" in shape:
+        raise ValueError("Unterminated comment")
+    if _FORBIDDEN.search(shape):
+        raise ValueError("SELECT ... INTO and locking reads are not allowed")
+    return cleaned_sql
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside literals so equivalent statements share a cache key."""
+    return "".join(
+        re.sub(r"\s+", " ", text) if kind == "code" else text
+        for kind, text in _split(sql)
+    ).strip()
+
+
+def referenced_tables(sql: str, tables) -> set[str] | None:
+    """
+    Return the names in ``tables`` that ``sql`` mentions (possibly more), or
+    ``None`` if its result can't be cached.
+    """
+    code = " ".join(text for kind, text in _split(sql) if kind == "code")
+    if _NONDETERMINISTIC.search(code):
+        return None
+    words = set(re.findall(r"\w+", code))
+    words.update(text[1:-1].replace("``", "`") for kind, text in _split(sql) if kind == "ident")
+    found = {table for table in tables if table in words}
+    return found or None
+
+
+def with_limits(sql: str, timeout_ms: int, max_rows: int) -> str:
+    """
+    Add optimizer hints that make MySQL stop the query after ``timeout_ms``
+    and return at most ``max_rows`` rows (unless the query has its own LIMIT).
+    """
+    hint = f"/*+ MAX_EXECUTION_TIME({int(timeout_ms)}) SET_VAR(sql_select_limit={int(max_rows)}) */"
+    return re.sub(r"^SELECT\b", f"SELECT {hint}", sql, count=1, flags=re.IGNORECASE)
+
+
+class StatementCache:
+    """Per-connection LRU cache of up to ``max_size`` prepared-statement cursors."""
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._by_conn: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def get(self, conn, sql: str):
+        """Return a ``(cursor, sql)`` pair to execute ``sql`` on ``conn``."""
+        with self._lock:
+            statements = self._by_conn.setdefault(conn, OrderedDict())
+            entry = statements.get(sql)
+            if entry is not None:
+                statements.move_to_end(sql)
+                self.hits += 1
+                # mysql.connector only skips re-preparing for the identical
+                # string object, so hand back the one it was prepared with.
+                return entry
+            self.misses += 1
+            evicted = statements.popitem(last=False)[1][0] if len(statements) >= self.max_size else None
+            entry = statements[sql] = (conn.cursor(prepared=True), sql)
+        if evicted is not None:
+            evicted.close()
+        return entry
+
+    def discard(self, conn, sql: str):
+        """Forget a statement, e.g. after it failed to prepare."""
+        with self._lock:
+            entry = self._by_conn.get(conn, {}).pop(sql, None)
+        if entry is not None:
+            try:
+                entry[0].close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "connections": len(self._by_conn),
+                "statements": sum(len(s) for s in self._by_conn.values()),
+            }
+
+
+def run_select(
+    conn,
+    statements: StatementCache,
+    sql: str,
+    params: list | tuple = (),
+    max_rows: int = 1000,
+    max_bytes: int = 1_000_000,
+    timeout_ms: int = 5000,
+) -> dict:
+    """
+    Run a validated ``SELECT`` and return ``{"columns", "data", "rows", "truncated"}``,
+    ``data`` holding one list per column, stopping at ``max_rows`` or ``max_bytes``.
+    """
+    # Ask for one extra row to tell "exactly max_rows" from "truncated".
+    sql = with_limits(normalize_sql(validate_select(sql)), timeout_ms, max_rows + 1)
+    cursor, sql = statements.get(conn, sql)
+    try:
+        cursor.execute(sql, tuple(params))
+    except Exception:
+        statements.discard(conn, sql)
+        raise
+    columns = [d[0] for d in cursor.description]
+    data = [[] for _ in columns]
+    rows = size = 0
+    truncated = False
+    while True:
+        row = cursor.fetchone()
+        if row is None:
+            break
+        size += len(json.dumps(row, default=str))
+        if rows >= max_rows or size > max_bytes:
+            truncated = True
+            break
+        for values, value in zip(data, row):
+            values.append(value)
+        rows += 1
+    return {"columns": columns, "data": data, "rows": rows, "truncated": truncated}
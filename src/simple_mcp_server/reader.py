@@ -0,0 +1,109 @@
+"""Streaming reads of MySQL tables as JSON Lines or CSV."""
+import csv
+import io
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from .catalog import quote_identifier
+
+FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# MySQL has no OFFSET without LIMIT; this is its documented "all rows" value.
+MAX_LIMIT = 18446744073709551615
+
+
+def parse_table_uri(uri: str, database: str) -> dict:
+    """
+    Parse ``mysql://host/<database>/<table>?format=&limit=&offset=&order_by=&after=``.
+
+    ``limit``/``offset`` page by position; ``order_by`` plus ``after`` pages
+    by keyset (rows whose ``order_by`` column is greater than ``after``).
+    Returns keyword arguments for ``stream_rows``.
+    """
+    parts = urlsplit(uri)
+    segments = [s for s in parts.path.split("/") if s]
+    if parts.scheme != "mysql" or len(segments) != 2 or segments[0] != database:
+        raise ValueError(f"Not a table in database '{database}': {uri}")
+    query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+    fmt = query.pop("format", "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    options = {"table": segments[1], "fmt": fmt, "order_by": query.pop("order_by", None)}
+    for name in ("limit", "offset"):
+        value = query.pop(name, None)
+        if value is not None:
+            if not value.isdigit():
+                raise ValueError(f"'{name}' must be a non-negative integer, got '{value}'")
+            options[name] = int(value)
+    after = query.pop("after", None)
+    if after is not None:
+        if not options["order_by"]:
+            raise ValueError("'after' requires 'order_by'")
+        options["after"] = after
+    if query:
+        raise ValueError(f"Unknown query parameters: {', '.join(sorted(query))}")
+    return options
+
+
+def build_select(
+    table: str,
+    limit: int | None = None,
+    offset: int | None = None,
+    order_by: str | None = None,
+    after: str | None = None,
+) -> tuple[str, tuple]:
+    """Build the ``SELECT`` statement and parameters for a table read."""
+    sql = f"SELECT * FROM {quote_identifier(table)}"
+    params: tuple = ()
+    if after is not None:
+        sql += f" WHERE {quote_identifier(order_by)} > %s"
+        params = (after,)
+    if order_by:
+        sql += f" ORDER BY {quote_identifier(order_by)}"
+    if limit is not None or offset:
+        sql += f" LIMIT {MAX_LIMIT if limit is None else limit}"
+        if offset:
+            sql += f" OFFSET {offset}"
+    return sql, params
+
+
+def stream_rows(conn, table: str, fmt: str = "jsonl", chunk_rows: int = 1000, **select):
+    """
+    Yield a table's rows as text chunks of at most ``chunk_rows`` rows.
+
+    Uses an unbuffered cursor and ``fetchmany`` so only one chunk is held in
+    memory at a time, whatever the size of the table. CSV output starts with
+    a header row.
+    """
+    sql, params = build_select(table, **select)
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        header = True
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            if fmt == "csv":
+                out = io.StringIO()
+                writer = csv.writer(out)
+                if header:
+                    writer.writerow(columns)
+                    header = False
+                writer.writerows(rows)
+                yield out.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+                )
+        if fmt == "csv" and header:
+            out = io.StringIO()
+            csv.writer(out).writerow(columns)
+            yield out.getvalue()
+    finally:
+        cursor.close()
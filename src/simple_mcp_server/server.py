@@ -1,25 +1,54 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from sse_starlette.sse import EventSourceResponse
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 import mcp.types as types
 from pydantic import AnyUrl
+import pydantic_core
+import anyio
+import asyncio
+import base64
+import contextlib
+import contextvars
+import functools
+import hashlib
 import logging
 import json
 import os
-import mysql.connector
+import time
+from urllib.parse import quote, unquote, urlsplit
+from mysql.connector import errorcode
+from mysql.connector.errors import ProgrammingError
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+from .cache import ResultCache, TTLCache, VersionWatcher
+from .catalog import fetch_columns, fetch_samples, fetch_schema_version, fetch_table_versions
+from .db import CircuitBreaker, CircuitOpenError, ConnectionPool, Database, is_outage
+from .files import DirectoryIndex, file_mime_type, load_file_resource, parse_file_uri, read_file, resolve_file_uri
+from .logs import Truncated, configure_logging
+from .metrics import CONTENT_TYPE, REGISTRY
+from .notes import open_note_store
+from .profiling import Profile, Profiler, record, span
+from .query import StatementCache, normalize_sql, referenced_tables, run_select, validate_select
+from .reader import FORMATS, parse_table_uri, stream_rows
+from .watch import SharedSubscriptionHub, SubscriptionHub, changed_keys, stat_files
+
+# Set up logging (LOG_LEVEL, LOG_QUEUE, LOG_MAX_PAYLOAD)
+LOG_LEVEL = configure_logging()
 logger = logging.getLogger(__name__)
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write out notes still buffered by NOTES_WRITE_BEHIND
+    await notes.close()
+
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create MCP server
 server = Server("simple-mcp-server")
 
-# Store notes
-notes = {}
-
 RESOURCE_FILES_DIR = os.path.join(os.path.dirname(__file__), '../../resources/files')
 
 MYSQL_CONFIG = {
@@ -27,73 +56,306 @@ MYSQL_CONFIG = {
     'user': 'root',
     'password': '',  # Update if you set a root password
     'database': 'bank',
+    # Seconds to wait for a TCP connection and handshake
+    'connection_timeout': int(os.environ.get("MYSQL_CONNECT_TIMEOUT", "5")),
 }
 
-@server.list_resources()
-async def handle_list_resources():
-    """List available note, file, and MySQL resources."""
+# Shared connection pool for every handler that talks to MySQL
+pool = ConnectionPool(
+    MYSQL_CONFIG,
+    min_size=int(os.environ.get("MYSQL_POOL_MIN_SIZE", "1")),
+    max_size=int(os.environ.get("MYSQL_POOL_MAX_SIZE", "10")),
+    idle_timeout=float(os.environ.get("MYSQL_POOL_IDLE_TIMEOUT", "300")),
+    acquire_timeout=float(os.environ.get("MYSQL_POOL_ACQUIRE_TIMEOUT", "1")),
+    health_check_interval=float(os.environ.get("MYSQL_POOL_HEALTH_CHECK_INTERVAL", "30")),
+)
+# Runs blocking MySQL calls off the event loop. Calls taking longer than
+# MYSQL_QUERY_TIMEOUT seconds are given up on and killed; after
+# MYSQL_BREAKER_FAILURES timeouts or connection errors in a row (0 turns
+# the breaker off), calls fail fast for MYSQL_BREAKER_RESET seconds before
+# MySQL is tried again.
+BREAKER_FAILURES = int(os.environ.get("MYSQL_BREAKER_FAILURES", "5"))
+database = Database(
+    pool,
+    max_concurrency=int(os.environ.get("MYSQL_MAX_CONCURRENCY", "0")) or None,
+    query_timeout=float(os.environ.get("MYSQL_QUERY_TIMEOUT", "10")) or None,
+    breaker=CircuitBreaker(
+        BREAKER_FAILURES, reset_timeout=float(os.environ.get("MYSQL_BREAKER_RESET", "30"))
+    ) if BREAKER_FAILURES > 0 else None,
+)
+
+# Worker processes serving the app (uvicorn --workers and gunicorn read
+# WEB_CONCURRENCY too). Caches stay per worker, each kept fresh by its own
+# watchers; notes and subscriptions must be shared.
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# Notes live in SQLite by default so they survive restarts and are shared
+# between workers (NOTES_STORE=memory | sqlite:///<path> | mysql[:<table>])
+notes = open_note_store(
+    os.environ.get("NOTES_STORE", "sqlite:///notes.db"),
+    database,
+    write_behind=float(os.environ.get("NOTES_WRITE_BEHIND", "0")),
+    max_batch=int(os.environ.get("NOTES_WRITE_BATCH", "1000")),
+)
+if WORKERS > 1 and os.environ.get("NOTES_STORE") == "memory":
+    raise ValueError("NOTES_STORE=memory is not shared between workers; use sqlite:///<path> or mysql")
+
+# Cached table resource metadata; entries are also dropped as soon
+# as the schema watcher sees DDL or writes in the database.
+resource_cache = TTLCache(ttl=float(os.environ.get("RESOURCE_CACHE_TTL", "60")))
+schema_watcher = VersionWatcher(
+    lambda: database.run(fetch_schema_version, MYSQL_CONFIG['database']),
+    lambda old, new: resource_cache.invalidate("tables"),
+    interval=float(os.environ.get("SCHEMA_POLL_INTERVAL", "5")),
+)
+
+# Resource subscriptions; notifications are delivered over GET /mcp/events.
+# With several workers they go through a SQLite file at MCP_STATE_PATH.
+if WORKERS > 1:
+    subscriptions: SubscriptionHub = SharedSubscriptionHub(
+        os.environ.get("MCP_STATE_PATH", "mcp_state.db"),
+        queue_size=int(os.environ.get("MCP_EVENT_QUEUE_SIZE", "100")),
+        interval=float(os.environ.get("MCP_STATE_POLL_INTERVAL", "0.2")),
+        on_cancel=lambda session_id, request_id: cancel_request(session_id, request_id),
+    )
+else:
+    subscriptions = SubscriptionHub(queue_size=int(os.environ.get("MCP_EVENT_QUEUE_SIZE", "100")))
+
+# Recursive index of RESOURCE_FILES_DIR, saved to FILE_INDEX_PATH so a
+# restart only re-reads directories that changed while it was down
+file_index = DirectoryIndex(RESOURCE_FILES_DIR, os.environ.get("FILE_INDEX_PATH", "file_index.json") or None)
+
+def publish_changes(uri_of, old: dict, new: dict, keys):
+    """resources/updated for ``uri_of(key)``, named by the key's old and new version."""
+    for key in keys:
+        # Every worker's watcher sees the same versions, so they publish the same change
+        subscriptions.publish_updated([uri_of(key)], f"{old.get(key)!r}>{new.get(key)!r}")
+
+def listing_digest(names: list[str]) -> str:
+    return hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()
+
+async def refresh_file_index() -> int:
+    with span("files.index"):
+        await anyio.to_thread.run_sync(file_index.refresh)
+    return file_index.generation
+
+# Checks directory mtimes and updates the index in the background
+index_watcher = VersionWatcher(
+    refresh_file_index,
+    lambda old, new: subscriptions.publish_list_changed(listing_digest(file_index.names)),
+    interval=float(os.environ.get("FILE_INDEX_INTERVAL", "2")),
+)
+
+def file_uri(name: str) -> str:
+    """The URI of a file by its normalized path relative to RESOURCE_FILES_DIR."""
+    return f"file://local/{quote(name)}"
+
+def subscribed_files() -> list[str]:
+    return [unquote(uri.removeprefix("file://local/")) for uri in subscriptions.subscribed("file://local/")]
+
+# Polls the mtimes and sizes of subscribed files once something subscribed to one
+file_watcher = VersionWatcher(
+    lambda: anyio.to_thread.run_sync(stat_files, RESOURCE_FILES_DIR, subscribed_files()),
+    # Files subscribed since the last poll are not in ``old`` and not reported
+    lambda old, new: publish_changes(file_uri, old, new, changed_keys(old, new) & old.keys()),
+    interval=float(os.environ.get("FILE_POLL_INTERVAL", "2")),
+)
+
+# Number of tables whose sample rows are fetched in one UNION ALL statement
+PREVIEW_BATCH_SIZE = int(os.environ.get("MYSQL_PREVIEW_BATCH_SIZE", "100"))
+
+async def load_table_resources(after: str = "", limit: int | None = None) -> list[tuple[str, types.Resource]]:
+    """
+    Build one ``(table, resource)`` pair per MySQL table with its schema and a
+    data preview. With ``limit``, only the first ``limit`` tables named after
+    ``after``.
+    """
+    columns = await database.run(fetch_columns, MYSQL_CONFIG['database'], after, limit)
+    tables = list(columns)
+    # Sample batches run concurrently on separate pooled connections
+    batches = await asyncio.gather(*(
+        database.run(fetch_samples, {table: columns[table] for table in tables[i:i + PREVIEW_BATCH_SIZE]})
+        for i in range(0, len(tables), PREVIEW_BATCH_SIZE)
+    ))
+    samples = {table: rows for batch in batches for table, rows in batch.items()}
     resources = []
-    # Notes as resources
-    if not notes:
-        notes["example"] = "This is an example note."
-    resources.extend([
-        types.Resource(
-            uri=AnyUrl(f"note://internal/{name}"),
-            name=f"Note: {name}",
-            description=f"A simple note named {name}",
-            mimeType="text/plain",
-        )
-        for name in notes
-    ])
-    # File resources
-    if os.path.exists(RESOURCE_FILES_DIR):
-        for fname in os.listdir(RESOURCE_FILES_DIR):
-            fpath = os.path.join(RESOURCE_FILES_DIR, fname)
-            if os.path.isfile(fpath):
-                resources.append(
-                    types.Resource(
-                        uri=AnyUrl(f"file://local/{fname}"),
-                        name=f"File: {fname}",
-                        description=f"A file resource named {fname}",
-                        mimeType="text/plain",
-                    )
-                )
-    # MySQL tables as resources
-    try:
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        cursor = conn.cursor()
-        cursor.execute("SHOW TABLES;")
-        tables = [row[0] for row in cursor.fetchall()]
+    with span("resources.build tables"):
         for table in tables:
-            cursor.execute(f"DESCRIBE {table};")
-            columns = cursor.fetchall()
-            schema = ', '.join([f"{col[0]} {col[1]}" for col in columns])
-            # Fetch up to 3 rows of data for preview
-            cursor.execute(f"SELECT * FROM {table} LIMIT 3;")
-            rows = cursor.fetchall()
+            schema = ', '.join([f"{col} {col_type}" for col, col_type in columns[table]])
+            rows = samples[table]
             data_preview = '\n'.join([str(row) for row in rows]) if rows else 'No data.'
-            resources.append(
-                types.Resource(
-                    uri=AnyUrl(f"mysql://localhost/bank/{table}"),
-                    name=f"MySQL Table: {table}",
-                    description=f"Table {table} schema: {schema}\nSample data:\n{data_preview}",
-                    mimeType="application/sql",
-                )
-            )
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        logger.error(f"MySQL error: {e}")
-        resources.append(
-            types.Resource(
-                uri=AnyUrl("mysql://localhost/bank"),
-                name="Bank MySQL Database",
-                description="MySQL database for bank customer and transaction details (connection error)",
+            resources.append((table, types.Resource(
+                uri=AnyUrl(f"mysql://localhost/bank/{table}"),
+                name=f"MySQL Table: {table}",
+                description=f"Table {table} schema: {schema}\nSample data:\n{data_preview}",
                 mimeType="application/sql",
-            )
-        )
+            )))
     return resources
 
+# Resources returned per resources/list page
+RESOURCE_PAGE_SIZE = int(os.environ.get("RESOURCE_PAGE_SIZE", "100"))
+
+async def list_note_resources(after: str, limit: int) -> list[tuple[str, types.Resource]]:
+    """The first ``limit`` notes named after ``after``, as ``(key, resource)`` pairs."""
+    with span("notes.names"):
+        names = await notes.names(after, limit)
+    if not names and not after:
+        await notes.put("example", "This is an example note.")
+        names = ["example"]
+    with span("resources.build notes"):
+        return [
+            (name, types.Resource(
+                uri=AnyUrl(f"note://internal/{name}"),
+                name=f"Note: {name}",
+                description=f"A simple note named {name}",
+                mimeType="text/plain",
+            ))
+            for name in names
+        ]
+
+async def list_file_resources(after: str, limit: int) -> list[tuple[str, types.Resource]]:
+    """The first ``limit`` files named after ``after``, as ``(key, resource)`` pairs."""
+    if not file_index.refreshed:
+        await refresh_file_index()
+    index_watcher.ensure_started()
+    with span("resources.build files"):
+        return [
+            (fname, types.Resource(
+                uri=AnyUrl(file_uri(fname)),
+                name=f"File: {fname}",
+                description=f"A file resource named {fname}",
+                mimeType="text/plain",
+            ))
+            for fname in file_index.page(after, limit)
+        ]
+
+async def list_table_resources(after: str, limit: int) -> list[tuple[str, types.Resource]]:
+    """The first ``limit`` MySQL tables named after ``after``, as ``(key, resource)`` pairs."""
+    key = f"tables:{after}:{limit}"
+    try:
+        schema_watcher.ensure_started()
+        return await resource_cache.get_or_load(key, lambda: load_table_resources(after, limit))
+    except Exception as e:
+        if isinstance(e, CircuitOpenError):
+            logger.debug("Skipping MySQL: %s", e)
+        else:
+            logger.error("MySQL error: %s", e)
+        # While MySQL is down, an expired listing beats none at all
+        stale = resource_cache.stale(key)
+        if stale is not None:
+            return stale
+        return [("", types.Resource(
+            uri=AnyUrl("mysql://localhost/bank"),
+            name="Bank MySQL Database",
+            description="MySQL database for bank customer and transaction details (connection error)",
+            mimeType="application/sql",
+        ))]
+
+# Resource sources in the order they are paged through
+RESOURCE_SOURCES = [list_note_resources, list_file_resources, list_table_resources]
+
+def encode_cursor(source: int, after: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([source, after]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[int, str]:
+    try:
+        source, after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(source, int) or not isinstance(after, str) or not 0 <= source < len(RESOURCE_SOURCES):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return source, after
+
+async def list_resource_page(
+    cursor: str | None = None, limit: int | None = None
+) -> tuple[list[types.Resource], str | None]:
+    """
+    Return one page of note, file and MySQL resources and the cursor for the next.
+
+    Sources are walked in order, each sorted by name, and only the items
+    needed for this page are fetched from each, so later pages never build
+    the full resource list.
+    """
+    limit = limit or RESOURCE_PAGE_SIZE
+    source, after = decode_cursor(cursor) if cursor else (0, "")
+    resources = []
+    while source < len(RESOURCE_SOURCES):
+        remaining = limit - len(resources)
+        # Ask for one extra item to learn whether this source has more
+        page = await RESOURCE_SOURCES[source](after, remaining + 1)
+        if len(page) > remaining:
+            page = page[:remaining]
+            resources.extend(resource for _, resource in page)
+            return resources, encode_cursor(source, page[-1][0])
+        resources.extend(resource for _, resource in page)
+        source, after = source + 1, ""
+        if len(resources) == limit and source < len(RESOURCE_SOURCES):
+            return resources, encode_cursor(source, after)
+    return resources, None
+
+async def handle_list_resources(request: types.ListResourcesRequest) -> types.ServerResult:
+    """List available note, file, and MySQL resources, one page at a time."""
+    cursor = request.params.cursor if request.params else None
+    resources, next_cursor = await list_resource_page(cursor)
+    return types.ServerResult(types.ListResourcesResult(resources=resources, nextCursor=next_cursor))
+
+# Registered directly: the list_resources() decorator of mcp 1.12 calls the
+# handler without the request, so it could not see the cursor
+server.request_handlers[types.ListResourcesRequest] = handle_list_resources
+
+# Rows per streamed chunk, and the row cap for reads that are not streamed
+READ_CHUNK_ROWS = int(os.environ.get("MYSQL_READ_CHUNK_ROWS", "1000"))
+READ_MAX_ROWS = int(os.environ.get("MYSQL_READ_MAX_ROWS", "10000"))
+
+def open_table_stream(uri: str, max_rows: int | None = None):
+    """Return the MIME type and an async iterator of row chunks for a table URI."""
+    options = parse_table_uri(uri, MYSQL_CONFIG['database'])
+    if max_rows is not None:
+        options["limit"] = min(options.get("limit", max_rows), max_rows)
+    chunks = database.iterate(functools.partial(stream_rows, chunk_rows=READ_CHUNK_ROWS, **options))
+    return FORMATS[options["fmt"]], chunks
+
+# Largest file (or file range) returned by a resource read
+FILE_READ_MAX_BYTES = int(os.environ.get("FILE_READ_MAX_BYTES", str(10 * 1024 * 1024)))
+
+@server.read_resource()
+async def handle_read_resource(uri: AnyUrl) -> list[ReadResourceContents]:
+    """
+    Read a MySQL table as JSON Lines or CSV, one content item per row chunk,
+    or a file (binary files come back as bytes, i.e. base64 blobs).
+    MCP responses are not streamed, so at most READ_MAX_ROWS rows are returned;
+    use GET /mcp/resources/read for full tables.
+    """
+    if uri.scheme == "file":
+        content, mime_type = await anyio.to_thread.run_sync(
+            load_file_resource, str(uri), RESOURCE_FILES_DIR, FILE_READ_MAX_BYTES
+        )
+        return [ReadResourceContents(content=content, mime_type=mime_type)]
+    if uri.scheme != "mysql":
+        raise ValueError(f"Unsupported URI scheme: {uri.scheme}")
+    mime_type, chunks = open_table_stream(str(uri), READ_MAX_ROWS)
+    return [ReadResourceContents(content=chunk, mime_type=mime_type) async for chunk in chunks]
+
+# Hard limits for the run-query tool
+QUERY_MAX_ROWS = int(os.environ.get("QUERY_MAX_ROWS", "1000"))
+QUERY_MAX_BYTES = int(os.environ.get("QUERY_MAX_BYTES", "1000000"))
+QUERY_TIMEOUT_MS = int(os.environ.get("QUERY_TIMEOUT_MS", "5000"))
+statement_cache = StatementCache(max_size=int(os.environ.get("QUERY_STATEMENT_CACHE_SIZE", "64")))
+
+# run-query results, dropped when a table they read changes
+result_cache = ResultCache(max_bytes=int(os.environ.get("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+def on_tables_changed(old: dict, new: dict):
+    result_cache.invalidate_tables(new)
+    publish_changes(lambda table: f"mysql://localhost/{MYSQL_CONFIG['database']}/{table}", old, new, changed_keys(old, new))
+
+# Per-table CREATE_TIME/UPDATE_TIME, polled for the result cache and for
+# subscriptions to mysql:// resources
+table_versions = VersionWatcher(
+    lambda: database.run(fetch_table_versions, MYSQL_CONFIG['database']),
+    on_tables_changed,
+    interval=float(os.environ.get("SCHEMA_POLL_INTERVAL", "5")),
+)
+
 @server.list_tools()
 async def handle_list_tools():
     """List available tools."""
@@ -110,12 +372,97 @@ async def handle_list_tools():
                 },
                 "required": ["name", "content"],
             },
-        )
+        ),
+        types.Tool(
+            name="search-notes",
+            description="Full-text search over note names and content; 'term*' matches prefixes",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string"},
+                    "limit": {"type": "integer", "minimum": 1, "maximum": 100},
+                },
+                "required": ["query"],
+            },
+        ),
+        types.Tool(
+            name="run-query",
+            description=(
+                "Run a read-only SELECT against the bank database. Results are columnar: "
+                "'columns' names each column and 'data' holds one list of values per column."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "sql": {"type": "string", "description": "A single SELECT statement; use %s placeholders for params"},
+                    "params": {"type": "array", "items": {"type": ["string", "number", "boolean", "null"]}},
+                    "max_rows": {"type": "integer", "minimum": 1, "maximum": QUERY_MAX_ROWS},
+                },
+                "required": ["sql"],
+            },
+        ),
     ]
 
+async def run_query_tool(arguments: dict | None) -> list[types.TextContent]:
+    """Execute the run-query tool and return the columnar result as JSON."""
+    sql = (arguments or {}).get("sql")
+    if not sql:
+        raise ValueError("Missing sql")
+    max_rows = arguments.get("max_rows")
+    if max_rows is None:
+        max_rows = QUERY_MAX_ROWS
+    if not isinstance(max_rows, int) or isinstance(max_rows, bool) or max_rows < 1:
+        raise InvalidParamsError(f"'max_rows' must be a positive integer, got {max_rows!r}")
+    max_rows = min(max_rows, QUERY_MAX_ROWS)
+    params = arguments.get("params")
+    if params is None:
+        params = []
+    if not isinstance(params, list) or not all(
+        value is None or isinstance(value, (str, int, float, bool)) for value in params
+    ):
+        raise InvalidParamsError("'params' must be an array of strings, numbers, booleans or nulls")
+    params = tuple(params)
+
+    # Only cache once table versions are known, and only for deterministic
+    # queries over known tables, so every entry can be invalidated.
+    key = tables = None
+    if result_cache.max_bytes > 0:
+        table_versions.ensure_started()
+        versions = table_versions.version
+        normalized = normalize_sql(validate_select(sql))
+        tables = referenced_tables(normalized, versions) if versions else None
+        if tables:
+            key = (normalized, params, max_rows)
+            text = result_cache.get(key, versions)
+            if text is not None:
+                return [types.TextContent(type="text", text=text)]
+            tables = {table: versions[table] for table in tables}
+
+    # MAX_EXECUTION_TIME stops the SELECT inside MySQL; the deadline
+    # (a second later) covers waiting on locks or a stuck connection
+    result = await database.run(
+        run_select, statement_cache, sql, params,
+        max_rows, QUERY_MAX_BYTES, QUERY_TIMEOUT_MS,
+        timeout=QUERY_TIMEOUT_MS / 1000 + 1,
+    )
+    text = json.dumps(result, default=str, separators=(",", ":"))
+    # A table that changed while the query ran may or may not be reflected
+    # in the result, so it is not cached under either version
+    if key is not None and all(table_versions.version.get(table) == version for table, version in tables.items()):
+        result_cache.put(key, text, tables)
+    return [types.TextContent(type="text", text=text)]
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict | None):
     """Handle tool calls."""
+    if name == "run-query":
+        return await run_query_tool(arguments)
+    if name == "search-notes":
+        query = (arguments or {}).get("query")
+        if not query:
+            raise ValueError("Missing query")
+        found = await notes.search(query, min(int(arguments.get("limit") or 20), 100))
+        return [types.TextContent(type="text", text=json.dumps(found))]
     if name != "add-note":
         raise ValueError(f"Unknown tool: {name}")
         
@@ -128,78 +475,411 @@ async def handle_call_tool(name: str, arguments: dict | None):
     if not note_name or not content:
         raise ValueError("Missing name or content")
         
-    notes[note_name] = content
+    await notes.put(note_name, content)
+    subscriptions.publish_updated([f"note://internal/{note_name}"])
+    subscriptions.publish_list_changed()
     
     return [types.TextContent(
         type="text",
         text=f"Added note '{note_name}' with content: {content}"
     )]
 
+class InvalidParamsError(ValueError):
+    """Malformed request arguments, answered with JSON-RPC error -32602."""
+
+def error_response(code: int, message: str, request_id=None) -> dict:
+    return {"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": request_id}
+
+def json_response(payload, status_code: int = 200) -> Response:
+    """
+    Encode ``payload`` straight to JSON bytes.
+
+    Pydantic models inside ``payload`` are serialized by pydantic-core in the
+    same pass, so FastAPI does not re-validate and re-encode the response.
+    """
+    with span("json.encode"):
+        body = pydantic_core.to_json(payload, by_alias=False)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+# JSON-RPC method name -> async handler(params) returning the result
+RPC_METHODS = {}
+
+def rpc_method(name: str):
+    """Register the decorated coroutine as the handler for JSON-RPC ``name``."""
+    def register(func):
+        RPC_METHODS[name] = func
+        return func
+    return register
+
+@rpc_method("listResources")
+async def rpc_list_resources(params: dict):
+    resources, next_cursor = await list_resource_page(params.get("cursor"))
+    return {"resources": resources, "nextCursor": next_cursor}
+
+@rpc_method("listTools")
+async def rpc_list_tools(params: dict):
+    return await handle_list_tools()
+
+@rpc_method("callTool")
+async def rpc_call_tool(params: dict):
+    return await handle_call_tool(params.get("name"), params.get("arguments", {}))
+
+@rpc_method("readResource")
+async def rpc_read_resource(params: dict):
+    uri = params.get("uri")
+    if not uri:
+        raise ValueError("Missing uri")
+    result = await handle_read_resource(AnyUrl(uri))
+    return {
+        "contents": [
+            {"uri": uri, "mimeType": c.mime_type, "text": c.content}
+            if isinstance(c.content, str) else
+            {"uri": uri, "mimeType": c.mime_type, "blob": base64.b64encode(c.content).decode()}
+            for c in result
+        ]
+    }
+
+# Session ID (from the Mcp-Session-Id header) of the request being handled
+current_session: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_session", default=None)
+
+# (session ID, request ID) -> cancel scope of the request, for notifications/cancelled
+in_flight: dict[tuple, anyio.CancelScope] = {}
+
+def cancel_request(session_id: str, request_id) -> bool:
+    """Cancel a request running in this worker; False if it isn't running here."""
+    scope = in_flight.get((session_id, request_id))
+    if scope is None:
+        return False
+    logger.info("Cancelling request %s of session %s", request_id, session_id)
+    scope.cancel()
+    return True
+
+@rpc_method("notifications/cancelled")
+async def rpc_cancelled(params: dict):
+    """
+    Cancel a request of the same session that is still running; its MySQL
+    statement is killed and it is answered with a "Request cancelled" error.
+    A request running in another worker is cancelled through the shared
+    state. Without a session ID the sender can't be told apart from other
+    clients, so the notification is ignored.
+    """
+    session_id = current_session.get()
+    request_id = params.get("requestId")
+    if session_id is not None and isinstance(request_id, (str, int)) and not cancel_request(session_id, request_id):
+        subscriptions.publish_cancelled(session_id, request_id)
+    return {}
+
+def subscription_uri(uri: str) -> str:
+    """
+    The URI a subscription to ``uri`` is stored and notified under; raises
+    ``ValueError`` if it can't be subscribed to. File paths must stay in
+    RESOURCE_FILES_DIR and are normalized.
+    """
+    scheme = uri.split(":", 1)[0]
+    if scheme == "mysql":
+        parse_table_uri(uri, MYSQL_CONFIG['database'])
+    elif scheme == "file":
+        _, relative = resolve_file_uri(uri, RESOURCE_FILES_DIR)
+        query = urlsplit(uri).query
+        return file_uri(relative) + (f"?{query}" if query else "")
+    elif scheme != "note":
+        raise ValueError(f"Unsupported URI scheme: {scheme}")
+    return uri
+
+@rpc_method("subscribeResource")
+async def rpc_subscribe_resource(params: dict):
+    uri = params.get("uri")
+    if not uri:
+        raise ValueError("Missing uri")
+    uri = await anyio.to_thread.run_sync(subscription_uri, uri)
+    await subscriptions.subscribe(current_session.get(), uri)
+    if uri.startswith("mysql:"):
+        table_versions.ensure_started()
+    elif uri.startswith("file:"):
+        file_watcher.ensure_started()
+    return {}
+
+@rpc_method("unsubscribeResource")
+async def rpc_unsubscribe_resource(params: dict):
+    uri = params.get("uri")
+    if not uri:
+        raise ValueError("Missing uri")
+    uri = await anyio.to_thread.run_sync(subscription_uri, uri)
+    await subscriptions.unsubscribe(current_session.get(), uri)
+    return {}
+
+@rpc_method("initialize")
+async def rpc_initialize(params: dict):
+    return {
+        "serverInfo": {
+            "name": "simple-mcp-server",
+            "version": "0.1.0"
+        },
+        "capabilities": {
+            "resources": True,
+            "prompts": False,
+            "tools": True,
+            "notifications": {
+                "resourceListChanged": True,
+                "resourceUpdated": True
+            }
+        }
+    }
+
+request_seconds = REGISTRY.histogram(
+    "mcp_request_duration_seconds", "Time to handle a JSON-RPC request on POST /mcp.", ("method", "tool")
+)
+request_errors = REGISTRY.counter(
+    "mcp_request_errors_total", "JSON-RPC requests on POST /mcp answered with an error.", ("method", "tool")
+)
+
+# Tool names used as metric labels; anything else is counted as "unknown"
+TOOL_NAMES: set[str] = set()
+
+async def tool_label(name) -> str:
+    if not TOOL_NAMES:
+        TOOL_NAMES.update(tool.name for tool in await handle_list_tools())
+    return name if name in TOOL_NAMES else "unknown"
+
+async def handle_message(data) -> dict | None:
+    """
+    Handle one JSON-RPC message and return its response, or ``None`` for a
+    notification (a message without an ``id``).
+    """
+    if not isinstance(data, dict):
+        return error_response(-32600, "Invalid Request")
+    method = data.get("method")
+    if not isinstance(method, str):
+        return error_response(-32600, "Invalid Request: missing method", data.get("id"))
+    handler = RPC_METHODS.get(method)
+    if handler is None:
+        request_errors.labels("unknown", "").inc()
+        response = error_response(-32601, f"Method {method} not found", data.get("id"))
+    else:
+        params = data.get("params") or {}
+        tool = await tool_label(params.get("name")) if method == "callTool" and isinstance(params, dict) else ""
+        session_id = current_session.get()
+        # Only requests of a session can be cancelled: clients without one
+        # would otherwise share keys and could cancel each other's requests
+        key = (session_id, data["id"]) if session_id is not None and isinstance(data.get("id"), (str, int)) else None
+        start = time.perf_counter()
+        with anyio.CancelScope() as scope:
+            if key is not None:
+                in_flight[key] = scope
+            try:
+                result = await handler(params)
+                response = {"jsonrpc": "2.0", "id": data.get("id"), "result": result}
+            except InvalidParamsError as e:
+                request_errors.labels(method, tool).inc()
+                response = error_response(-32602, str(e), data.get("id"))
+            except Exception as e:
+                logger.error("Error handling request: %s", e)
+                request_errors.labels(method, tool).inc()
+                response = error_response(-32000, str(e), data.get("id"))
+            finally:
+                if in_flight.get(key) is scope:
+                    del in_flight[key]
+        if scope.cancelled_caught:
+            # Same code as the MCP SDK uses for cancelled requests
+            request_errors.labels(method, tool).inc()
+            response = error_response(0, "Request cancelled", data.get("id"))
+        end = time.perf_counter()
+        request_seconds.labels(method, tool).observe(end - start)
+        record(method, start, end)
+    return response if "id" in data else None
+
+# Largest JSON-RPC batch accepted in one POST
+MAX_BATCH_SIZE = int(os.environ.get("MCP_MAX_BATCH_SIZE", "50"))
+
+# Opt-in request profiling, off by default: MCP_PROFILE_SAMPLE_RATE profiles
+# that fraction of POSTs, MCP_PROFILE_REQUESTS=1 honours an X-MCP-Profile
+# header (spans | cprofile). Profiles are written to MCP_PROFILE_DIR.
+profiler = Profiler(
+    sample_rate=float(os.environ.get("MCP_PROFILE_SAMPLE_RATE", "0")),
+    allow_requests=os.environ.get("MCP_PROFILE_REQUESTS", "0") == "1",
+    mode=os.environ.get("MCP_PROFILE_MODE", "spans"),
+    directory=os.environ.get("MCP_PROFILE_DIR", "profiles"),
+)
+
 @app.post("/mcp")
 async def mcp_endpoint(request: Request):
-    """Handle incoming MCP requests."""
-    data = await request.json()
-    logger.debug(f"Received request: {data}")
-    method = data.get("method")
+    """
+    Handle incoming MCP requests: a single JSON-RPC message or a batch array.
+
+    Messages in a batch run concurrently and their responses come back in
+    request order. Notifications get no response; a request made only of
+    notifications is answered with ``202 Accepted`` and no body.
+
+    A profiled request is answered with an ``X-MCP-Profile-Id`` header; the
+    profile can be fetched from ``GET /mcp/profiles/<id>``.
+    """
+    mode = profiler.choose(request.headers.get("x-mcp-profile")) if profiler.enabled else None
+    if mode is None:
+        return await handle_post(request)
+    with Profile("POST /mcp", mode) as profile:
+        response = await handle_post(request)
+    await anyio.to_thread.run_sync(profiler.save, profile)
+    response.headers["X-MCP-Profile-Id"] = profile.id
+    return response
+
+async def handle_post(request: Request) -> Response:
     try:
-        if method == "listResources":
-            result = await handle_list_resources()
-            return {
-                "jsonrpc": "2.0",
-                "id": data.get("id"),
-                "result": [r.dict() for r in result]
-            }
-        elif method == "listTools":
-            result = await handle_list_tools()
-            return {
-                "jsonrpc": "2.0",
-                "id": data.get("id"),
-                "result": [t.dict() for t in result]
-            }
-        elif method == "callTool":
-            params = data.get("params", {})
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
-            result = await handle_call_tool(tool_name, arguments)
-            return {
-                "jsonrpc": "2.0",
-                "id": data.get("id"),
-                "result": [r.dict() for r in result]
-            }
-        elif method == "initialize":
-            return {
-                "jsonrpc": "2.0",
-                "id": data.get("id"),
-                "result": {
-                    "serverInfo": {
-                        "name": "simple-mcp-server",
-                        "version": "0.1.0"
-                    },
-                    "capabilities": {
-                        "resources": True,
-                        "prompts": False,
-                        "tools": True,
-                        "notifications": {
-                            "resourceListChanged": True
-                        }
-                    }
-                }
-            }
-        else:
-            return {
-                "jsonrpc": "2.0",
-                "error": {"code": -32601, "message": f"Method {method} not found"},
-                "id": data.get("id")
-            }
+        data = await request.json()
+    except ValueError:
+        return json_response(error_response(-32700, "Parse error"))
+    logger.debug("Received request: %s", Truncated(data))
+    current_session.set(request.headers.get("mcp-session-id"))
+    if not isinstance(data, list):
+        response = await handle_message(data)
+        return Response(status_code=202) if response is None else json_response(response)
+    if not data:
+        return json_response(error_response(-32600, "Invalid Request: empty batch"))
+    if len(data) > MAX_BATCH_SIZE:
+        return json_response(error_response(
+            -32600, f"Invalid Request: batch of {len(data)} exceeds the limit of {MAX_BATCH_SIZE}"
+        ))
+    responses = [r for r in await asyncio.gather(*map(handle_message, data)) if r is not None]
+    return json_response(responses) if responses else Response(status_code=202)
+
+@app.get("/mcp/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """The span timeline of a profiled request, by its X-MCP-Profile-Id."""
+    profile = await anyio.to_thread.run_sync(profiler.load, profile_id)
+    if profile is None:
+        return JSONResponse({"error": f"Unknown profile: {profile_id}"}, status_code=404)
+    return profile
+
+@app.get("/mcp/resources/read")
+async def read_resource_stream(uri: str):
+    """
+    Stream a MySQL table resource in row chunks with constant memory use, or
+    send a file. Whole files are sent by the ASGI server where it supports
+    zero-copy sends, and honour HTTP Range headers.
+    """
+    if uri.startswith("file:"):
+        return await read_file_response(uri)
+    try:
+        media_type, chunks = open_table_stream(uri)
+        # Pull the first chunk so bad URIs and database errors get a proper status
+        first = await anext(chunks, "")
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except ProgrammingError as e:
+        # MySQL rejected the statement: an unknown table, column or the like
+        status = 404 if e.errno == errorcode.ER_NO_SUCH_TABLE else 400
+        return JSONResponse({"error": str(e)}, status_code=status)
     except Exception as e:
-        logger.error(f"Error handling request: {e}")
-        return {
-            "jsonrpc": "2.0",
-            "error": {"code": -32000, "message": str(e)},
-            "id": data.get("id")
-        }
+        logger.error("MySQL error: %s", e)
+        status = 503 if isinstance(e, CircuitOpenError) or is_outage(e) else 500
+        return JSONResponse({"error": str(e)}, status_code=status)
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    return StreamingResponse(body(), media_type=media_type)
+
+async def read_file_response(uri: str) -> Response:
+    try:
+        options = await anyio.to_thread.run_sync(parse_file_uri, uri, RESOURCE_FILES_DIR)
+        if len(options) == 1:
+            mime_type = await anyio.to_thread.run_sync(file_mime_type, options["path"])
+            return FileResponse(options["path"], media_type=mime_type)
+        content, mime_type = await anyio.to_thread.run_sync(
+            functools.partial(read_file, **options, max_bytes=FILE_READ_MAX_BYTES)
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return Response(content, media_type=mime_type)
+
+@app.get("/mcp/events")
+async def events_stream():
+    """
+    Server-sent notifications for one client. The first event (``session``)
+    carries the ID to send as ``Mcp-Session-Id`` with subscribeResource.
+    """
+    client_id = await subscriptions.connect()
+
+    async def events():
+        try:
+            yield {"event": "session", "data": client_id}
+            while True:
+                yield {"data": json.dumps(await subscriptions.next(client_id))}
+        finally:
+            # The stream is being cancelled; still record the disconnect
+            with anyio.CancelScope(shield=True):
+                await subscriptions.disconnect(client_id)
+    return EventSourceResponse(events(), headers={"Mcp-Session-Id": client_id})
+
+@app.get("/mcp/cache")
+async def cache_stats():
+    """Report resource, query result and prepared statement cache counters."""
+    return {
+        "resources": resource_cache.stats(),
+        "queries": result_cache.stats(),
+        "statements": statement_cache.stats(),
+        "subscriptions": subscriptions.stats(),
+    }
+
+def cache_lookups() -> dict:
+    caches = {"resources": resource_cache, "queries": result_cache, "statements": statement_cache}
+    return {
+        (name, result): stats[result]
+        for name, stats in ((name, cache.stats()) for name, cache in caches.items())
+        for result in ("hits", "misses")
+    }
+
+REGISTRY.gauge(
+    "mysql_pool_connections", "MySQL pool connections by state.",
+    lambda: {(state,): count for state, count in database.pool.stats().items()}, ("state",),
+)
+REGISTRY.gauge("mysql_busy_threads", "Worker threads currently running MySQL calls.", lambda: database.limiter.borrowed_tokens)
+if database.breaker is not None:
+    REGISTRY.gauge(
+        "mysql_circuit_open", "1 while the MySQL circuit breaker fails calls fast (open or probing), else 0.",
+        lambda: int(database.breaker.state != "closed"),
+    )
+    REGISTRY.gauge(
+        "mysql_circuit_rejected", "MySQL calls failed fast by the circuit breaker.", lambda: database.breaker.rejected
+    )
+REGISTRY.gauge("mcp_sse_connections", "Open GET /mcp/events streams.", lambda: subscriptions.stats()["clients"])
+REGISTRY.gauge(
+    "mcp_event_queue_depth", "Notifications waiting in /mcp/events client queues.", lambda: subscriptions.stats()["queued"]
+)
+REGISTRY.gauge(
+    "mcp_events_dropped", "Notifications dropped because a client queue was full.", lambda: subscriptions.stats()["dropped"]
+)
+REGISTRY.gauge("mcp_cache_lookups", "Cache lookups by cache and result.", cache_lookups, ("cache", "result"))
+REGISTRY.gauge(
+    "mcp_cache_hit_ratio", "Share of cache lookups that were hits.",
+    lambda: {
+        (name,): hits / (hits + misses) if hits + misses else 0.0
+        for name, hits, misses in (
+            (name, lookups[(name, "hits")], lookups[(name, "misses")])
+            for lookups in [cache_lookups()] for name in ("resources", "queries", "statements")
+        )
+    },
+    ("cache",),
+)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this process."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+async def main():
+    """Serve the app in this process (the ``simple-mcp-server`` command)."""
+    import uvicorn
+    print("[simple-mcp-server] Starting MCP HTTP server on http://0.0.0.0:8000/mcp")
+    await uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=8000, log_level=LOG_LEVEL)).serve()
 
 if __name__ == "__main__":
     import uvicorn
     print("[simple-mcp-server] Starting MCP HTTP server on http://0.0.0.0:8000/mcp")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="debug")
\ No newline at end of file
+    if WORKERS > 1:
+        # Each worker process imports the app itself
+        uvicorn.run(
+            "simple_mcp_server.server:app", host="0.0.0.0", port=8000, log_level=LOG_LEVEL, workers=WORKERS
+        )
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, log_level=LOG_LEVEL)
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""Resource subscriptions and the change signals that drive them."""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+
+def changed_keys(old: dict, new: dict) -> set:
+    """Keys added, removed or given a different value between ``old`` and ``new``."""
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+def stat_files(directory: str, names) -> dict[str, tuple[int, int] | None]:
+    """Return ``{name: (mtime_ns, size)}`` for ``names`` under ``directory``, None where missing."""
+    stats = {}
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(directory, name))
+            stats[name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stats[name] = None
+    return stats
+
+
+class SubscriptionHub:
+    """
+    Connected clients, their subscriptions (grouped by URI without the query
+    string) and a bounded notification queue each, without duplicates.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._pending: dict[str, set[str]] = {}
+        # base URI -> client ID -> URIs as subscribed
+        self._subscribers: dict[str, dict[str, set[str]]] = {}
+
+    async def connect(self) -> str:
+        client_id = uuid.uuid4().hex
+        self._queues[client_id] = asyncio.Queue(self.queue_size)
+        self._pending[client_id] = set()
+        return client_id
+
+    async def disconnect(self, client_id: str):
+        self._queues.pop(client_id, None)
+        self._pending.pop(client_id, None)
+        for base in list(self._subscribers):
+            clients = self._subscribers[base]
+            clients.pop(client_id, None)
+            if not clients:
+                del self._subscribers[base]
+
+    def _check(self, client_id: str | None):
+        if client_id not in self._queues:
+            raise ValueError(f"Unknown session: {client_id}; open GET /mcp/events first")
+
+    async def subscribe(self, client_id: str | None, uri: str):
+        self._check(client_id)
+        base = uri.split("?", 1)[0]
+        self._subscribers.setdefault(base, {}).setdefault(client_id, set()).add(uri)
+
+    async def unsubscribe(self, client_id: str | None, uri: str):
+        self._check(client_id)
+        base = uri.split("?", 1)[0]
+        clients = self._subscribers.get(base, {})
+        uris = clients.get(client_id, set())
+        uris.discard(uri)
+        if not uris:
+            clients.pop(client_id, None)
+        if not clients:
+            self._subscribers.pop(base, None)
+
+    def subscribed(self, prefix: str) -> list[str]:
+        """Subscribed base URIs starting with ``prefix``."""
+        return [base for base in self._subscribers if base.startswith(prefix)]
+
+    async def next(self, client_id: str) -> dict:
+        """Wait for the next notification for ``client_id``."""
+        notification = await self._queues[client_id].get()
+        self._pending[client_id].discard(notification["key"])
+        return notification["message"]
+
+    def _send(self, client_id: str, key: str, message: dict):
+        pending = self._pending[client_id]
+        if key in pending:
+            return
+        try:
+            self._queues[client_id].put_nowait({"key": key, "message": message})
+            pending.add(key)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def publish_updated(self, base_uris, change: str | None = None):
+        """
+        Queue ``resources/updated`` for every subscription to one of ``base_uris``.
+        ``change`` names the change so other workers' watchers don't repeat it.
+        """
+        for base in base_uris:
+            for client_id, uris in self._subscribers.get(base, {}).items():
+                for uri in uris:
+                    self._send(client_id, uri, {
+                        "jsonrpc": "2.0",
+                        "method": "notifications/resources/updated",
+                        "params": {"uri": uri},
+                    })
+
+    def publish_list_changed(self, change: str | None = None):
+        """Queue ``resources/list_changed`` for every connected client."""
+        for client_id in self._queues:
+            self._send(client_id, "", {"jsonrpc": "2.0", "method": "notifications/resources/list_changed"})
+
+    def publish_cancelled(self, session_id: str, request_id):
+        """Pass a cancellation on to the worker running the request; one worker has none to ask."""
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._queues),
+            "subscribed_uris": sum(len(uris) for clients in self._subscribers.values() for uris in clients.values()),
+            "queued": sum(queue.qsize() for queue in self._queues.values()),
+            "dropped": self.dropped,
+        }
+
+
+class SharedSubscriptionHub(SubscriptionHub):
+    """
+    SubscriptionHub for several worker processes, kept in a SQLite file.
+
+    Workers append events (one per key and ``change``) and poll for new ones
+    every ``interval`` seconds. Cancellations are events too, passed to
+    ``on_cancel(session_id, request_id)``.
+    """
+
+    # Event keys of cancellations; resource keys are URIs and "" is list_changed
+    CANCEL = "cancel:"
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS hub_sessions (id TEXT PRIMARY KEY, pid INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS hub_subscriptions ("
+        "session TEXT NOT NULL, uri TEXT NOT NULL, base TEXT NOT NULL, PRIMARY KEY (session, uri))",
+        "CREATE TABLE IF NOT EXISTS hub_events ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, change TEXT NOT NULL, at REAL NOT NULL, "
+        "UNIQUE (key, change))",
+        "CREATE INDEX IF NOT EXISTS hub_events_at ON hub_events (at)",
+    )
+
+    def __init__(
+        self, path: str, queue_size: int = 100, interval: float = 0.2, retention: float = 60.0,
+        max_unsent: int = 10000, on_cancel=None,
+    ):
+        super().__init__(queue_size)
+        self.on_cancel = on_cancel
+        self.path = path
+        self.interval = interval
+        self.retention = retention
+        self.max_unsent = max_unsent
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        # (key, change) events not yet appended, oldest first; "" is list_changed
+        self._outbox: dict[tuple[str, str], None] = {}
+        self._last_event = None
+        self._bases: set[str] = set()
+        self._task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(hub_events)")}
+        if columns and "change" not in columns:
+            # Events only live for a minute, so an older layout is just replaced
+            conn.execute("DROP TABLE hub_events")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        # Forget sessions of workers that died without disconnecting them
+        for session, pid in conn.execute("SELECT id, pid FROM hub_sessions").fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                conn.execute("DELETE FROM hub_subscriptions WHERE session = ?", (session,))
+                conn.execute("DELETE FROM hub_sessions WHERE id = ?", (session,))
+            except OSError:
+                pass
+        return conn
+
+    def _locked(self, func, *args):
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            return func(self._conn, *args)
+
+    async def _run(self, func, *args):
+        return await anyio.to_thread.run_sync(functools.partial(self._locked, func, *args))
+
+    def ensure_started(self):
+        if self._task is None or self._task.done():
+            # A fresh context, so the poller does not inherit the request that started it
+            self._task = asyncio.get_running_loop().create_task(self._poll(), context=contextvars.Context())
+
+    async def connect(self) -> str:
+        client_id = await super().connect()
+        await self._run(lambda conn: conn.execute(
+            "INSERT INTO hub_sessions (id, pid) VALUES (?, ?)", (client_id, os.getpid())
+        ))
+        self.ensure_started()
+        return client_id
+
+    async def disconnect(self, client_id: str):
+        await super().disconnect(client_id)
+
+        def disconnect(conn):
+            conn.execute("DELETE FROM hub_subscriptions WHERE session = ?", (client_id,))
+            conn.execute("DELETE FROM hub_sessions WHERE id = ?", (client_id,))
+        await self._run(disconnect)
+
+    async def subscribe(self, client_id, uri):
+        def subscribe(conn):
+            if conn.execute("SELECT 1 FROM hub_sessions WHERE id = ?", (client_id,)).fetchone() is None:
+                return False
+            conn.execute(
+                "INSERT OR IGNORE INTO hub_subscriptions (session, uri, base) VALUES (?, ?, ?)",
+                (client_id, uri, uri.split("?", 1)[0]),
+            )
+            return True
+        if not await self._run(subscribe):
+            raise ValueError(f"Unknown session: {client_id}; open GET /mcp/events first")
+        self._bases.add(uri.split("?", 1)[0])
+        self.ensure_started()
+
+    async def unsubscribe(self, client_id, uri):
+        await self._run(lambda conn: conn.execute(
+            "DELETE FROM hub_subscriptions WHERE session = ? AND uri = ?", (client_id, uri)
+        ))
+
+    def subscribed(self, prefix):
+        return [base for base in self._bases if base.startswith(prefix)]
+
+    def _queue_events(self, events):
+        for event in events:
+            self._outbox.pop(event, None)
+            self._outbox[event] = None
+        while len(self._outbox) > self.max_unsent:
+            del self._outbox[next(iter(self._outbox))]
+            self.dropped += 1
+        # Workers that never held an /mcp/events stream still have to share their changes
+        self.ensure_started()
+
+    def publish_updated(self, base_uris, change=None):
+        change = change or uuid.uuid4().hex
+        self._queue_events((base, change) for base in base_uris)
+
+    def publish_list_changed(self, change=None):
+        self._queue_events([("", change or uuid.uuid4().hex)])
+
+    def publish_cancelled(self, session_id, request_id):
+        self._queue_events([(self.CANCEL + json.dumps([session_id, request_id]), uuid.uuid4().hex)])
+
+    def _exchange(self, conn, outbox: list[tuple[str, str]]):
+        """Append ``outbox``, then return new events and this worker's subscriptions."""
+        now = time.time()
+        if self._last_event is None:
+            self._last_event = conn.execute("SELECT COALESCE(MAX(id), 0) FROM hub_events").fetchone()[0]
+        if outbox:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO hub_events (key, change, at) VALUES (?, ?, ?)",
+                    [(key, change, now) for key, change in outbox],
+                )
+                conn.execute("DELETE FROM hub_events WHERE at < ?", (now - self.retention,))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        events = conn.execute(
+            "SELECT id, key FROM hub_events WHERE id > ? ORDER BY id", (self._last_event,)
+        ).fetchall()
+        if events:
+            self._last_event = events[-1][0]
+        subscriptions = conn.execute(
+            "SELECT s.session, s.uri, s.base FROM hub_subscriptions s "
+            "JOIN hub_sessions h ON h.id = s.session WHERE h.pid = ?",
+            (os.getpid(),),
+        ).fetchall()
+        bases = {row[0] for row in conn.execute("SELECT DISTINCT base FROM hub_subscriptions")}
+        return [key for _, key in events], subscriptions, bases
+
+    async def _poll(self):
+        while True:
+            outbox, self._outbox = list(self._outbox), {}
+            try:
+                events, rows, self._bases = await self._run(self._exchange, outbox)
+            except Exception as e:
+                logger.error("Subscription sync failed: %s", e)
+                # Retry next time, ahead of anything published meanwhile
+                newer, self._outbox = self._outbox, {}
+                self._queue_events([*outbox, *newer])
+            else:
+                subscribers: dict[str, dict[str, set[str]]] = {}
+                for client_id, uri, base in rows:
+                    if client_id in self._queues:
+                        subscribers.setdefault(base, {}).setdefault(client_id, set()).add(uri)
+                self._subscribers = subscribers
+                for key in dict.fromkeys(events):
+                    if key.startswith(self.CANCEL):
+                        if self.on_cancel is not None:
+                            self.on_cancel(*json.loads(key[len(self.CANCEL):]))
+                    elif key:
+                        super().publish_updated([key])
+                    else:
+                        super().publish_list_changed()
+            await asyncio.sleep(self.interval)
+
+    def stats(self):
+        return {**super().stats(), "unsent": len(self._outbox)}
@@ -0,0 +1,124 @@
+"""Tests for the file resource path guard (simple_mcp_server.files.parse_file_uri)."""
+import os
+
+import pytest
+
+from simple_mcp_server.files import parse_file_uri, resolve_file_uri
+
+
+@pytest.fixture
+def root(tmp_path):
+    """A resource directory with a nested file, next to files it must not expose."""
+    files = tmp_path / "files"
+    (files / "docs").mkdir(parents=True)
+    (files / "docs" / "readme.txt").write_text("inside\n")
+    (files / "a b.txt").write_text("space\n")
+    (tmp_path / "secret.txt").write_text("outside\n")
+    # Shares the root's name as a prefix, but is a sibling of it
+    (tmp_path / "files_private").mkdir()
+    (tmp_path / "files_private" / "key.txt").write_text("outside\n")
+    return str(files)
+
+
+def test_resolves_files_inside_root(root):
+    assert parse_file_uri("file://local/docs/readme.txt", root) == {
+        "path": os.path.join(os.path.realpath(root), "docs", "readme.txt"),
+    }
+    assert parse_file_uri("file://local/a%20b.txt", root)["path"].endswith("a b.txt")
+    # A leading slash in the path is still relative to the root
+    assert parse_file_uri("file://local//docs/readme.txt", root)["path"].endswith("readme.txt")
+    assert parse_file_uri("file://local/docs/../docs/readme.txt", root)["path"].endswith("readme.txt")
+
+
+@pytest.mark.parametrize("path", [
+    "../secret.txt",
+    "docs/../../secret.txt",
+    "../files_private/key.txt",
+    "../../../../../../etc/passwd",
+    # Percent-encoded dots and slashes are decoded before the check
+    "%2e%2e/secret.txt",
+    "%2E%2E%2Fsecret.txt",
+    "docs/%2e%2e/%2e%2e/secret.txt",
+    "..%2f..%2f..%2fetc%2fpasswd",
+    # The root itself is not a file resource
+    "",
+    ".",
+    "docs/..",
+])
+def test_rejects_traversal(root, path):
+    with pytest.raises(ValueError, match="escapes the resource directory"):
+        parse_file_uri(f"file://local/{path}", root)
+
+
+def test_resolve_returns_normalized_relative_path(root):
+    # Subscriptions are keyed by this path, so spellings of one file must agree
+    for uri in ["file://local/a%20b.txt", "file://local//a%20b.txt", "file://local/docs/../a%20b.txt"]:
+        assert resolve_file_uri(uri, root)[1] == "a b.txt"
+    with pytest.raises(ValueError, match="escapes the resource directory"):
+        resolve_file_uri("file://local/%2e%2e/secret.txt", root)
+
+
+def test_double_encoding_is_not_decoded_twice(root):
+    # %252e decodes to a literal "%2e" name, which does not exist
+    with pytest.raises(ValueError, match="File not found"):
+        parse_file_uri("file://local/%252e%252e/secret.txt", root)
+
+
+def test_absolute_paths_stay_inside_root(root):
+    with pytest.raises(ValueError, match="File not found"):
+        parse_file_uri("file://local/%2Fetc%2Fpasswd", root)
+
+
+def test_rejects_null_bytes(root):
+    with pytest.raises(ValueError):
+        parse_file_uri("file://local/docs/readme.txt%00.png", root)
+
+
+def test_rejects_symlinks_out_of_root(root, tmp_path):
+    os.symlink(tmp_path / "secret.txt", os.path.join(root, "link.txt"))
+    os.symlink(tmp_path, os.path.join(root, "docs", "up"))
+    with pytest.raises(ValueError, match="escapes the resource directory"):
+        parse_file_uri("file://local/link.txt", root)
+    with pytest.raises(ValueError, match="escapes the resource directory"):
+        parse_file_uri("file://local/docs/up/secret.txt", root)
+
+
+def test_allows_symlinks_within_root(root):
+    os.symlink(os.path.join(root, "docs", "readme.txt"), os.path.join(root, "alias.txt"))
+    assert parse_file_uri("file://local/alias.txt", root)["path"] == os.path.join(
+        os.path.realpath(root), "docs", "readme.txt"
+    )
+
+
+def test_root_reached_through_symlink(root, tmp_path):
+    link = tmp_path / "files_link"
+    os.symlink(root, link)
+    assert parse_file_uri("file://local/docs/readme.txt", str(link))["path"].endswith("readme.txt")
+    with pytest.raises(ValueError, match="escapes the resource directory"):
+        parse_file_uri("file://local/../secret.txt", str(link))
+
+
+@pytest.mark.parametrize("uri", [
+    "file:///etc/passwd",
+    "file://remote/docs/readme.txt",
+    "http://local/docs/readme.txt",
+])
+def test_rejects_other_locations(root, uri):
+    with pytest.raises(ValueError, match="Not a local file resource"):
+        parse_file_uri(uri, root)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("bytes=0-9", {"byte_range": (0, 9)}),
+    ("bytes=10-", {"byte_range": (10, None)}),
+    ("lines=2-4", {"line_range": (2, 4)}),
+])
+def test_parses_ranges(root, query, expected):
+    options = parse_file_uri(f"file://local/docs/readme.txt?{query}", root)
+    assert {key: value for key, value in options.items() if key != "path"} == expected
+
+
+@pytest.mark.parametrize("query", ["bytes=5-1", "bytes=-5", "lines=a-b", "bytes=0-1&lines=0-1", "offset=3"])
+def test_rejects_bad_queries(root, query):
+    with pytest.raises(ValueError):
+        parse_file_uri(f"file://local/docs/readme.txt?{query}", root)
@@ -4,12 +4,13 @@ import json
 import ast
 import re
 
-def get_resources():
+def get_resources(cursor=None):
     url = "http://localhost:8000/mcp"
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
-        "method": "listResources"
+        "method": "listResources",
+        "params": {"cursor": cursor} if cursor else {}
     }
     headers = {"Content-Type": "application/json"}
     response = requests.post(url, headers=headers, data=json.dumps(payload))
@@ -47,9 +48,13 @@ def print_mysql_tables(resources):
                 print(desc)
 
 def main():
-    result = get_resources()
-    resources = result.get("result", [])
-    print_mysql_tables(resources)
+    cursor = None
+    while True:
+        result = get_resources(cursor).get("result", {})
+        print_mysql_tables(result.get("resources", []))
+        cursor = result.get("nextCursor")
+        if not cursor:
+            break
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,118 @@
+"""Tests for the run-query SQL allow-list (simple_mcp_server.query.validate_select) and its arguments."""
+import asyncio
+
+import pytest
+
+from simple_mcp_server.query import validate_select
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT 1", "SELECT 1"),
+    ("  select * from customers ;  ", "select * from customers"),
+    ("SELECT * FROM customers -- trailing comment", "SELECT * FROM customers"),
+    ("# leading comment\nSELECT 1", "SELECT 1"),
+    ("/* leading */ SELECT 1", "SELECT 1"),
+    # Keywords inside literals and quoted identifiers are data, not SQL
+    ("SELECT 'x; DROP TABLE customers' AS note", "SELECT 'x; DROP TABLE customers' AS note"),
+    ("SELECT 'INTO OUTFILE', \"FOR UPDATE\" FROM t", "SELECT 'INTO OUTFILE', \"FOR UPDATE\" FROM t"),
+    ("SELECT `into`, `for update;` FROM t", "SELECT `into`, `for update;` FROM t"),
+    ("SELECT 'it''s; here'", "SELECT 'it''s; here'"),
+    ("SELECT 'a\\'; DROP TABLE t; --'", "SELECT 'a\\'; DROP TABLE t; --'"),
+    ("SELECT '/*' AS a, '*/' AS b", "SELECT '/*' AS a, '*/' AS b"),
+])
+def test_accepts_single_select(sql, expected):
+    assert validate_select(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM customers",
+    "UPDATE customers SET balance = 0",
+    "DROP TABLE customers",
+    "SHOW TABLES",
+    "SELECTX 1",
+    "/* SELECT */ DELETE FROM customers",
+    "-- SELECT\nDROP TABLE customers",
+    "# SELECT\nDROP TABLE customers",
+    "'SELECT' DELETE FROM customers",
+])
+def test_rejects_other_statements(sql):
+    with pytest.raises(ValueError, match="Only SELECT"):
+        validate_select(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1; DROP TABLE customers",
+    "SELECT 1;DROP TABLE customers;",
+    "SELECT 1; SELECT 2",
+    "SELECT 1 /* a */ ; DELETE FROM customers",
+    "SELECT 1 -- x\n; DROP TABLE customers",
+    "SELECT 1 #\n; DROP TABLE customers",
+    # "--" only starts a comment when followed by whitespace
+    "SELECT 1 --; DROP TABLE customers",
+    # An unterminated string does not hide what follows it
+    "SELECT 'abc; DROP TABLE customers",
+    "SELECT `abc; DROP TABLE customers",
+])
+def test_rejects_multiple_statements(sql):
+    with pytest.raises(ValueError, match="single statement"):
+        validate_select(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1 /* unterminated",
+    "SELECT 1 */ FROM t",
+])
+def test_rejects_unbalanced_comments(sql):
+    with pytest.raises(ValueError, match="Unterminated comment"):
+        validate_select(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM customers INTO OUTFILE '/tmp/customers.csv'",
+    "SELECT * FROM customers INTO DUMPFILE '/tmp/customers.bin'",
+    "SELECT id INTO @id FROM customers LIMIT 1",
+    "SELECT id FROM customers LIMIT 1 into\n@id",
+    "SELECT id FROM customers INTO/**/@id",
+    "SELECT `id`INTO@id FROM customers",
+    "SELECT 'x' INTO @x, '*/'",
+    "SELECT 1 UNION SELECT id FROM customers INTO OUTFILE '/tmp/x'",
+    "SELECT * FROM customers FOR UPDATE",
+    "SELECT * FROM customers for update nowait",
+    "SELECT * FROM customers FOR\n  SHARE",
+    "SELECT * FROM customers FOR/* x */UPDATE",
+    "SELECT * FROM customers LOCK IN SHARE MODE",
+])
+def test_rejects_into_and_locking_reads(sql):
+    with pytest.raises(ValueError, match="INTO and locking reads"):
+        validate_select(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    # MySQL runs the body of /*! ... */ comments, so they must not survive
+    "SELECT 1 /*! INTO OUTFILE '/tmp/x' */",
+    "SELECT 1 /*!50000 ; DROP TABLE customers */",
+    "SELECT /*+ MAX_EXECUTION_TIME(999999) */ 1",
+])
+def test_strips_executable_comments(sql):
+    cleaned = validate_select(sql)
+    assert "/*" not in cleaned
+    assert "INTO" not in cleaned and "DROP" not in cleaned and "MAX_EXECUTION_TIME" not in cleaned
+
+
+@pytest.mark.parametrize("arguments", [
+    {"max_rows": 0},
+    {"max_rows": -5},
+    {"max_rows": "10"},
+    {"max_rows": True},
+    {"params": "abc"},
+    {"params": {"id": 1}},
+    {"params": [[1, 2]]},
+])
+def test_rejects_malformed_arguments(arguments):
+    from simple_mcp_server.server import handle_message
+
+    response = asyncio.run(handle_message({
+        "jsonrpc": "2.0", "id": 1, "method": "callTool",
+        "params": {"name": "run-query", "arguments": {"sql": "SELECT 1", **arguments}},
+    }))
+    assert response["error"]["code"] == -32602
@@ -0,0 +1,73 @@
+"""End-to-end check that the root server's stdio transport delivers resource notifications."""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from pydantic import AnyUrl
+
+SERVER = Path(__file__).resolve().parent.parent / "server.py"
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+
+async def collect_notifications(calls) -> list:
+    """Run ``calls(session)`` against a fresh stdio server; return the notifications received."""
+    received = []
+
+    async def on_message(message):
+        if isinstance(message, types.ServerNotification):
+            received.append(message.root)
+
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(SERVER)],
+        env={**os.environ, "MCP_SERVER_MODE": "stdio", "NOTES_STORE": "memory", "FILE_INDEX_PATH": "",
+             "RESOURCE_NOTIFY_WINDOW": "0.05", "LOG_LEVEL": "WARNING"},
+    )
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write, message_handler=on_message) as session:
+            await session.initialize()
+            await calls(session)
+            for _ in range(50):
+                if len(received) >= 2:
+                    break
+                await asyncio.sleep(0.1)
+    return received
+
+
+def test_add_note_notifies_subscribers():
+    async def calls(session):
+        await session.subscribe_resource(AnyUrl("note://internal/x"))
+        await session.call_tool("add-note", {"name": "x", "content": "hello"})
+
+    received = run(collect_notifications(calls))
+    assert any(isinstance(n, types.ResourceListChangedNotification) for n in received)
+    assert [str(n.params.uri) for n in received if isinstance(n, types.ResourceUpdatedNotification)] == [
+        "note://internal/x"
+    ]
+
+
+def test_bulk_add_notifies_subscribers():
+    async def calls(session):
+        await session.subscribe_resource(AnyUrl("note://internal/b"))
+        await session.call_tool("bulk-add-notes", {"notes": [{"name": "a", "content": "1"}, {"name": "b", "content": "2"}]})
+
+    received = run(collect_notifications(calls))
+    assert [str(n.params.uri) for n in received if isinstance(n, types.ResourceUpdatedNotification)] == [
+        "note://internal/b"
+    ]
+
+
+def test_file_subscriptions_are_rejected():
+    async def calls(session):
+        with pytest.raises(McpError, match="only supported for note://"):
+            await session.subscribe_resource(AnyUrl("file://local/example.txt"))
+
+    assert run(collect_notifications(calls)) == []
@@ -0,0 +1,60 @@
+"""Notes buffered by NOTES_WRITE_BEHIND reach the backing store when a server stops."""
+import asyncio
+import contextlib
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from simple_mcp_server.notes import SQLiteNoteStore, WriteBehindNoteStore
+
+SERVER = Path(__file__).resolve().parent.parent / "server.py"
+
+
+def stored_note(path, name):
+    """The content committed to the SQLite file for ``name``, read without the store."""
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes'").fetchone():
+            return None
+        row = conn.execute("SELECT content FROM notes WHERE name = ?", (name,)).fetchone()
+    return row and row[0]
+
+
+def test_package_server_flushes_on_shutdown(tmp_path, monkeypatch):
+    from simple_mcp_server import server
+
+    path = tmp_path / "notes.db"
+    # A delay no test waits out, so only shutdown can write the note
+    monkeypatch.setattr(server, "notes", WriteBehindNoteStore(SQLiteNoteStore(str(path)), delay=3600))
+    with TestClient(server.app) as client:
+        response = client.post("/mcp", json={
+            "jsonrpc": "2.0", "id": 1, "method": "callTool",
+            "params": {"name": "add-note", "arguments": {"name": "kept", "content": "hello"}},
+        })
+        assert "error" not in response.json()
+        assert stored_note(path, "kept") is None
+    assert stored_note(path, "kept") == "hello"
+
+
+def test_root_server_flushes_on_exit(tmp_path):
+    path = tmp_path / "notes.db"
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(SERVER)],
+        env={**os.environ, "MCP_SERVER_MODE": "stdio", "NOTES_STORE": f"sqlite:///{path}",
+             "NOTES_WRITE_BEHIND": "3600", "FILE_INDEX_PATH": "", "LOG_LEVEL": "WARNING"},
+    )
+
+    async def add_note():
+        async with stdio_client(params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.call_tool("add-note", {"name": "kept", "content": "hello"})
+                assert stored_note(path, "kept") is None
+
+    asyncio.run(asyncio.wait_for(add_note(), 30))
+    assert stored_note(path, "kept") == "hello"
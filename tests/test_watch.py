@@ -0,0 +1,26 @@
+"""Cancellations pass between workers through a SharedSubscriptionHub."""
+import asyncio
+
+from simple_mcp_server.watch import SharedSubscriptionHub
+
+
+def test_cancellation_reaches_other_workers(tmp_path):
+    async def main():
+        cancelled = []
+        path = str(tmp_path / "state.db")
+        owner = SharedSubscriptionHub(path, interval=0.02, on_cancel=lambda *request: cancelled.append(request))
+        sender = SharedSubscriptionHub(path, interval=0.02)
+        owner.ensure_started()
+        await asyncio.sleep(0.1)
+        sender.publish_cancelled("session", 7)
+        sender.publish_cancelled("session", "seven")
+        for _ in range(100):
+            if len(cancelled) == 2:
+                break
+            await asyncio.sleep(0.02)
+        owner._task.cancel()
+        sender._task.cancel()
+        # Request IDs keep their JSON type, so they match the owner's in-flight keys
+        return cancelled
+
+    assert asyncio.run(main()) == [("session", 7), ("session", "seven")]